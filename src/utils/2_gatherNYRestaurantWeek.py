@@ -63,7 +63,7 @@ def main():
         },
         {
             "path": "NYCRestaurantWeek/2_Geocoder.py",
-            "description": "Restaurant Geocoding"
+            "description": "Restaurant Page Fetch (Geocoding + Characteristics)"
         },
         {
             "path": "NYCRestaurantWeek/3_Characteristics.py",
@@ -183,6 +183,11 @@ class MichelinAlgoliaScraper:
                     'area_name': restaurant.get('area_name', '')
                 }
                 
+                # Coordinates, so the join can compare only restaurants at the same location
+                geoloc = restaurant.get('_geoloc') or {}
+                clean_data['latitude'] = geoloc.get('lat')
+                clean_data['longitude'] = geoloc.get('lng')
+                
                 # Try to find description in various possible fields
                 description = None
                 for field in ['description', 'summary', 'about', 'content', 'text']:
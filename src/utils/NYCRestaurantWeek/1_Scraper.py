@@ -1,8 +1,339 @@
 import requests
 import json
 import time
-from concurrent.futures import ThreadPoolExecutor, as_completed
-from typing import List, Dict, Any
+import math
+import hashlib
+import argparse
+import asyncio
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from typing import List, Dict, Any, Optional, NamedTuple, Tuple, Iterable, Iterator
+
+from checkpoint import CheckpointJournal, open_journal
+
+# The asyncio engine needs httpx; without it we fall back to the threaded path
+try:
+    import httpx
+except ImportError:
+    httpx = None
+
+# HTTP/2 is only negotiated when the optional h2 package is installed
+try:
+    import h2  # noqa: F401
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+class ListingChunk(NamedTuple):
+    """A slice of the listing addressed by item offset and page size"""
+    offset: int
+    limit: int
+    attempt: int = 0
+    not_before: float = 0.0  # time.monotonic() before which a re-queued chunk is not sent
+
+    @property
+    def page(self) -> int:
+        return self.offset // self.limit + 1
+
+    @property
+    def key(self) -> str:
+        """Checkpoint journal key"""
+        return f"{self.offset}:{self.limit}"
+
+class ChunkResult(NamedTuple):
+    """Outcome of fetching one listing chunk"""
+    chunk: ListingChunk
+    data: Optional[Dict[str, Any]]
+    status: Optional[int]  # None means the request never got a response (timeout, DNS, ...)
+    latency: float
+    error: Optional[str] = None
+    content_hash: Optional[str] = None
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+    unchanged: bool = False  # Same content as the previous run's manifest (304 or matching hash)
+    resumed: bool = False  # Served from the checkpoint journal, no request made
+
+    @property
+    def ok(self) -> bool:
+        return self.status in (200, 304)
+
+class AdaptiveConcurrencyController:
+    """AIMD controller for in-flight requests and the listing page size
+    
+    Both knobs grow additively while a window of responses stays healthy (p95 latency
+    under target, error rate under threshold) and are cut multiplicatively on 429/5xx
+    or timeouts. The page limit moves along base_limit * 2**k so every chunk stays
+    aligned to a page boundary of the listing API.
+    """
+    
+    def __init__(self, initial_concurrency: int = 8, min_concurrency: int = 1, max_concurrency: int = 16,
+                 base_limit: int = 12, max_limit: int = 48, target_p95: float = 1.5,
+                 max_error_rate: float = 0.05, window_size: int = 16):
+        self.concurrency = initial_concurrency
+        self.min_concurrency = min_concurrency
+        self.max_concurrency = max_concurrency
+        self.base_limit = base_limit
+        self.page_limit = base_limit
+        self.max_limit = max_limit
+        
+        # Largest page size the API has been seen to return in full; growth never skips past it
+        self.confirmed_limit = base_limit
+        self.target_p95 = target_p95
+        self.max_error_rate = max_error_rate
+        self.window_size = window_size
+        
+        # Current measurement window
+        self.latencies = []
+        self.errors = 0
+        self.healthy_windows = 0
+        
+        # Responses seen since the last back-off, so one burst of failures only halves once
+        self.samples_since_backoff = window_size
+        self.backoff_delay = 0.0
+        
+    @staticmethod
+    def is_throttle(status: Optional[int]) -> bool:
+        """429, 5xx and timeouts (no status) mean the server wants us to slow down"""
+        return status is None or status == 429 or status >= 500
+    
+    @staticmethod
+    def percentile(values: List[float], pct: float) -> float:
+        ordered = sorted(values)
+        index = max(0, math.ceil(pct / 100 * len(ordered)) - 1)
+        return ordered[index]
+    
+    def record(self, result: ChunkResult):
+        """Feed one response into the controller and adjust the knobs"""
+        
+        if result.resumed:
+            return
+        
+        self.samples_since_backoff += 1
+        
+        if result.ok:
+            self.latencies.append(result.latency)
+        else:
+            self.errors += 1
+            if self.is_throttle(result.status):
+                self.back_off()
+                return
+        
+        if len(self.latencies) + self.errors >= self.window_size:
+            self.evaluate_window()
+    
+    def evaluate_window(self):
+        """Additive increase when the last window was healthy"""
+        
+        total = len(self.latencies) + self.errors
+        error_rate = self.errors / total if total else 0.0
+        p95 = self.percentile(self.latencies, 95) if self.latencies else float('inf')
+        
+        if error_rate <= self.max_error_rate and p95 <= self.target_p95:
+            self.backoff_delay = 0.0
+            self.concurrency = min(self.max_concurrency, self.concurrency + 1)
+            self.healthy_windows += 1
+            
+            # Grow the page size more slowly than concurrency: one step every other healthy window,
+            # and only past a size the API has already returned in full
+            if (self.healthy_windows % 2 == 0 and self.page_limit * 2 <= self.max_limit
+                    and self.page_limit <= self.confirmed_limit):
+                self.page_limit *= 2
+            
+            print(f"📈 Healthy window (p95 {p95:.2f}s, errors {error_rate:.0%}): "
+                  f"concurrency {self.concurrency}, page limit {self.page_limit}")
+        else:
+            self.healthy_windows = 0
+        
+        self.latencies = []
+        self.errors = 0
+    
+    def back_off(self):
+        """Multiplicative decrease, at most once per window of responses"""
+        
+        if self.samples_since_backoff < self.concurrency:
+            return
+        
+        self.concurrency = max(self.min_concurrency, self.concurrency // 2)
+        self.page_limit = max(self.base_limit, self.page_limit // 2)
+        self.backoff_delay = min(30.0, max(0.5, self.backoff_delay * 2))
+        self.healthy_windows = 0
+        self.samples_since_backoff = 0
+        self.latencies = []
+        self.errors = 0
+        
+        print(f"📉 Backing off: concurrency {self.concurrency}, page limit {self.page_limit}, "
+              f"retry delay {self.backoff_delay:.1f}s")
+    
+    def confirm_page_limit(self, limit: int):
+        """The API returned a full page at this limit, so it honours it"""
+        self.confirmed_limit = max(self.confirmed_limit, limit)
+    
+    def cap_page_limit(self, limit: int):
+        """The API returned a short page, so it does not honour this limit"""
+        self.max_limit = max(self.base_limit, limit // 2)
+        self.page_limit = min(self.page_limit, self.max_limit)
+
+class ListingCrawlPlan:
+    """Hands out page-aligned chunks of the listing and re-queues failed ones"""
+    
+    def __init__(self, total: int, start_offset: int, max_attempts: int = 5,
+                 layout: Optional[List[ListingChunk]] = None):
+        self.total = total
+        self.max_attempts = max_attempts
+        self.retries = deque()
+        
+        # A previous run's chunk layout is replayed first so manifest keys line up
+        self.planned = deque(layout or [])
+        self.frontier = self.planned[-1].offset + self.planned[-1].limit if self.planned else start_offset
+        self.in_flight = 0
+        self.lost = []
+        
+    def next_chunk(self, page_limit: int, base_limit: int) -> Optional[ListingChunk]:
+        """Next chunk to fetch, preferring retries and splitting them to the current limit"""
+        
+        # Retries waiting out their back-off stay queued while other chunks go ahead
+        now = time.monotonic()
+        ready = next((i for i, retry in enumerate(self.retries) if retry.not_before <= now), None)
+        if ready is not None:
+            chunk = self.retries[ready]
+            del self.retries[ready]
+            if chunk.limit > page_limit:
+                # Split an oversized retry into aligned chunks of the current page size
+                parts = [ListingChunk(offset, page_limit, chunk.attempt)
+                         for offset in range(chunk.offset, chunk.offset + chunk.limit, page_limit)
+                         if offset < self.total]
+                chunk = parts[0]
+                self.retries.extendleft(reversed(parts[1:]))
+            self.in_flight += 1
+            return chunk
+        
+        if self.planned:
+            self.in_flight += 1
+            return self.planned.popleft()
+        
+        if self.frontier >= self.total:
+            return None
+        
+        # Largest ladder step that keeps the frontier on a page boundary
+        limit = page_limit
+        while limit > base_limit and self.frontier % limit:
+            limit //= 2
+        
+        chunk = ListingChunk(self.frontier, limit)
+        self.frontier += limit
+        self.in_flight += 1
+        return chunk
+    
+    def complete(self):
+        self.in_flight -= 1
+    
+    def requeue(self, chunk: ListingChunk, delay: float = 0.0) -> bool:
+        """Put a failed chunk back in the queue, not to be sent for delay seconds;
+        False once it has used up its attempts"""
+        
+        self.in_flight -= 1
+        if chunk.attempt + 1 >= self.max_attempts:
+            self.lost.append(chunk)
+            return False
+        
+        not_before = time.monotonic() + delay if delay else 0.0
+        self.retries.append(chunk._replace(attempt=chunk.attempt + 1, not_before=not_before))
+        return True
+    
+    def requeue_split(self, chunk: ListingChunk, limit: int):
+        """Re-queue a chunk as smaller chunks without counting it as a failed attempt"""
+        
+        self.in_flight -= 1
+        self.retries.extend(
+            ListingChunk(offset, limit, chunk.attempt)
+            for offset in range(chunk.offset, min(chunk.offset + chunk.limit, self.total), limit)
+        )
+    
+    def retry_wait(self) -> Optional[float]:
+        """Seconds until the next delayed retry may be sent, or None when none is waiting"""
+        
+        if not self.retries:
+            return None
+        return max(0.0, min(retry.not_before for retry in self.retries) - time.monotonic())
+    
+    def has_pending(self) -> bool:
+        return bool(self.retries) or bool(self.planned) or self.frontier < self.total
+    
+    def is_done(self) -> bool:
+        return not self.has_pending() and self.in_flight == 0
+
+def iter_ndjson(filename: str) -> Iterator[Dict[str, Any]]:
+    """Read an NDJSON file one record at a time, ignoring a line truncated by a crash"""
+    
+    with open(filename, 'r', encoding='utf-8') as f:
+        for line in f:
+            if not line.endswith('\n'):
+                break
+            if line.strip():
+                yield json.loads(line)
+
+class StreamingPageWriter:
+    """Append each page's raw and cleaned items to NDJSON files as soon as the page arrives
+    
+    Pages arrive in completion order, so the byte span of every page is kept (a few
+    bytes per page) and used to write the final JSON arrays in listing order one page
+    at a time.
+    """
+    
+    def __init__(self, raw_file: str, clean_file: str):
+        self.raw_file = raw_file
+        self.clean_file = clean_file
+        self.raw_spans = {}
+        self.clean_spans = {}
+        self.items_written = 0
+        
+    def __enter__(self):
+        # Binary mode so tell() gives exact byte offsets for the spans
+        self.raw_handle = open(self.raw_file, 'wb')
+        self.clean_handle = open(self.clean_file, 'wb')
+        return self
+    
+    def __exit__(self, exc_type, exc, tb):
+        self.raw_handle.close()
+        self.clean_handle.close()
+    
+    @staticmethod
+    def append_lines(handle, records: Iterable[Dict]) -> Tuple[int, int]:
+        start = handle.tell()
+        for record in records:
+            handle.write(json.dumps(record, ensure_ascii=False).encode('utf-8') + b'\n')
+        end = handle.tell()
+        
+        # Flush per page so a crash mid-crawl leaves every finished page on disk
+        handle.flush()
+        return start, end
+    
+    def write_page(self, offset: int, raw_items: List[Dict], clean_items: Iterable[Dict]):
+        self.raw_spans[offset] = self.append_lines(self.raw_handle, raw_items)
+        self.clean_spans[offset] = self.append_lines(self.clean_handle, clean_items)
+        self.items_written += len(raw_items)
+    
+    @staticmethod
+    def export_json(ndjson_file: str, spans: Dict[int, Tuple[int, int]], json_file: str):
+        """Rewrite an NDJSON file as an indented JSON array in listing order, page by page"""
+        
+        with open(ndjson_file, 'rb') as source, open(json_file, 'w', encoding='utf-8') as target:
+            target.write('[')
+            first = True
+            for offset in sorted(spans):
+                start, end = spans[offset]
+                source.seek(start)
+                for line in source.read(end - start).splitlines():
+                    record = json.dumps(json.loads(line), indent=2, ensure_ascii=False)
+                    target.write(('\n' if first else ',\n') + '  ' + record.replace('\n', '\n  '))
+                    first = False
+            target.write('\n]' if not first else ']')
+        print(f"💾 Data saved to {json_file}")
+    
+    def export(self, raw_json: str, clean_json: str):
+        """Write the JSON arrays the later pipeline stages read"""
+        self.export_json(self.raw_file, self.raw_spans, raw_json)
+        self.export_json(self.clean_file, self.clean_spans, clean_json)
 
 class FastRestaurantWeekScraper:
     def __init__(self):
@@ -24,83 +355,503 @@ class FastRestaurantWeekScraper:
             "Pragma": "no-cache"
         }
         
-    def get_restaurants_page(self, page: int) -> Dict[str, Any]:
-        """Get a single page of restaurants"""
-        payload = {
+        # Starting politeness level; the controller adapts from here while the crawl runs
+        self.initial_concurrency = 8
+        self.max_concurrency = 16
+        self.page_limit = 12
+        self.max_page_limit = 48
+        self.request_timeout = 10
+        self.max_attempts = 5
+        
+        # Delta crawl state: the previous run's manifest and outputs, and this run's manifest
+        self.previous_manifest = {}
+        self.previous_raw_by_slug = {}
+        self.previous_clean_by_slug = {}
+        self.manifest_total = 0
+        self.manifest_pages = {}
+        self.page_results = {}
+        self.unchanged_offsets = set()
+        
+        # Streaming mode: pages go straight to disk instead of being kept in memory
+        self.stream_writer: Optional[StreamingPageWriter] = None
+        self.items_fetched = 0
+        
+        # Checkpointing: every finished chunk is journaled, --resume serves them back
+        self.journal: Optional[CheckpointJournal] = None
+        self.resumed_keys = set()
+        self.lost_chunks = []
+        
+    def build_page_payload(self, page: int, limit: Optional[int] = None) -> Dict[str, Any]:
+        """Build the POST body for a single listing page"""
+        return {
             "page": page,
-            "limit": 12,
+            "limit": limit or self.page_limit,
             "filters": {}
         }
+    
+    def new_controller(self) -> AdaptiveConcurrencyController:
+        return AdaptiveConcurrencyController(
+            initial_concurrency=self.initial_concurrency,
+            max_concurrency=self.max_concurrency,
+            base_limit=self.page_limit,
+            max_limit=self.max_page_limit
+        )
+        
+    def get_restaurants_page(self, page: int) -> Dict[str, Any]:
+        """Get a single page of restaurants"""
+        result = self.fetch_chunk(ListingChunk((page - 1) * self.page_limit, self.page_limit))
+        
+        if result.status == 200:
+            return result.data
+        
+        print(f"Error on page {page}: {result.error}")
+        return None
+    
+    def load_previous_run(self, manifest_file: str, raw_file: str, clean_file: str):
+        """Load the last run's manifest and outputs so unchanged pages can be reused"""
+        
+        try:
+            with open(manifest_file, 'r', encoding='utf-8') as f:
+                manifest = json.load(f)
+            with open(raw_file, 'r', encoding='utf-8') as f:
+                raw = json.load(f)
+            with open(clean_file, 'r', encoding='utf-8') as f:
+                clean = json.load(f)
+        except FileNotFoundError:
+            print("📂 No previous run found, doing a full crawl")
+            return
+        except Exception as e:
+            print(f"⚠️  Could not load previous run ({e}), doing a full crawl")
+            return
+        
+        self.previous_raw_by_slug = {item.get('slug'): item for item in raw}
+        self.previous_clean_by_slug = {item.get('slug'): item for item in clean}
+        
+        # Only pages whose items are all still on disk can be reused
+        pages = {
+            offset: entry for offset, entry in manifest.get('pages', {}).items()
+            if all(slug in self.previous_raw_by_slug and slug in self.previous_clean_by_slug
+                   for slug in entry.get('slugs', []))
+        }
+        manifest['pages'] = pages
+        self.previous_manifest = manifest
+        print(f"📂 Loaded manifest with {len(pages)} reusable pages from {manifest_file}")
+    
+    def manifest_entry(self, chunk: ListingChunk) -> Optional[Dict[str, Any]]:
+        """Previous manifest entry for exactly this chunk, if any"""
+        entry = self.previous_manifest.get('pages', {}).get(str(chunk.offset))
+        if entry and entry.get('limit') == chunk.limit:
+            return entry
+        return None
+    
+    def use_journal(self, journal: CheckpointJournal, resume: bool):
+        """Journal every finished chunk; when resuming, serve already finished ones from it
+        
+        Only the keys are loaded up front; a resumed chunk's items are read from the
+        journal when that chunk comes up, so --stream --resume keeps memory flat.
+        """
+        
+        self.journal = journal
+        if resume:
+            self.resumed_keys = journal.completed_keys()
+    
+    def previous_layout(self, start_offset: int, total: int) -> List[ListingChunk]:
+        """Chunk layout of the resumed or previous run, starting after page 1
+        
+        Gaps between known chunks (failed or never fetched) are filled with base-limit
+        chunks so every known chunk keeps its key.
+        """
+        
+        if self.resumed_keys:
+            known = dict(tuple(map(int, key.split(':'))) for key in self.resumed_keys)
+        else:
+            known = {int(offset): entry['limit'] for offset, entry in self.previous_manifest.get('pages', {}).items()}
+        
+        last_known = max(known, default=-1)
+        layout = []
+        offset = start_offset
+        while offset < total and offset <= last_known:
+            limit = known.get(offset, self.page_limit)
+            layout.append(ListingChunk(offset, limit))
+            offset += limit
+        return layout
+    
+    def resumed_result(self, chunk: ListingChunk) -> Optional[ChunkResult]:
+        """Chunk finished by an earlier, interrupted run"""
+        
+        if chunk.key not in self.resumed_keys:
+            return None
+        
+        entry = self.journal.result(chunk.key)
+        if entry is None:
+            return None
+        
+        return ChunkResult(chunk, {'total': entry['total'], 'items': entry['items']}, 200, 0.0,
+                           content_hash=entry.get('hash'), etag=entry.get('etag'),
+                           last_modified=entry.get('last_modified'), resumed=True)
+    
+    def conditional_headers(self, chunk: ListingChunk) -> Dict[str, str]:
+        """If-None-Match / If-Modified-Since from the previous run, when the API sent them"""
+        
+        entry = self.manifest_entry(chunk)
+        headers = {}
+        if entry and entry.get('etag'):
+            headers['If-None-Match'] = entry['etag']
+        if entry and entry.get('last_modified'):
+            headers['If-Modified-Since'] = entry['last_modified']
+        return headers
+    
+    def build_chunk_result(self, chunk: ListingChunk, status: int, body: bytes,
+                           headers: Dict[str, str], latency: float) -> ChunkResult:
+        """Turn a raw response into a ChunkResult, skipping the JSON parse for unchanged pages"""
+        
+        previous = self.manifest_entry(chunk)
+        etag = headers.get('ETag')
+        last_modified = headers.get('Last-Modified')
+        
+        if status == 304 and previous:
+            return ChunkResult(chunk, None, 304, latency,
+                               content_hash=previous['hash'],
+                               etag=etag or previous.get('etag'),
+                               last_modified=last_modified or previous.get('last_modified'),
+                               unchanged=True)
+        
+        if status != 200:
+            return ChunkResult(chunk, None, status, latency, f"HTTP {status}")
         
+        content_hash = hashlib.sha256(body).hexdigest()
+        if previous and previous['hash'] == content_hash:
+            return ChunkResult(chunk, None, 200, latency, content_hash=content_hash,
+                               etag=etag, last_modified=last_modified, unchanged=True)
+        
+        return ChunkResult(chunk, json.loads(body), 200, latency, content_hash=content_hash,
+                           etag=etag, last_modified=last_modified)
+    
+    def fetch_chunk(self, chunk: ListingChunk) -> ChunkResult:
+        """Fetch one listing chunk with requests (threaded engine)"""
+        
+        resumed = self.resumed_result(chunk)
+        if resumed:
+            return resumed
+        
+        start = time.perf_counter()
         try:
             response = requests.post(
                 self.base_url,
-                headers=self.headers,
-                json=payload,
-                timeout=10  # Reduced timeout
+                headers={**self.headers, **self.conditional_headers(chunk)},
+                json=self.build_page_payload(chunk.page, chunk.limit),
+                timeout=self.request_timeout
             )
+            latency = time.perf_counter() - start
+            
+            return self.build_chunk_result(chunk, response.status_code, response.content, response.headers, latency)
             
-            if response.status_code == 200:
-                return response.json()
-            else:
-                print(f"Error on page {page}: {response.status_code}")
-                return None
-                
         except Exception as e:
-            print(f"Request failed for page {page}: {e}")
+            return ChunkResult(chunk, None, None, time.perf_counter() - start, str(e))
+    
+    async def fetch_chunk_async(self, client: "httpx.AsyncClient", chunk: ListingChunk) -> ChunkResult:
+        """Fetch one listing chunk over the shared async connection pool"""
+        
+        resumed = self.resumed_result(chunk)
+        if resumed:
+            return resumed
+        
+        start = time.perf_counter()
+        try:
+            response = await client.post(
+                self.base_url,
+                headers=self.conditional_headers(chunk),
+                json=self.build_page_payload(chunk.page, chunk.limit)
+            )
+            latency = time.perf_counter() - start
+            
+            return self.build_chunk_result(chunk, response.status_code, response.content, response.headers, latency)
+            
+        except Exception as e:
+            return ChunkResult(chunk, None, None, time.perf_counter() - start, str(e) or type(e).__name__)
+    
+    def retry_first_chunk(self, first: ChunkResult, controller: AdaptiveConcurrencyController) -> Optional[ListingChunk]:
+        """Next attempt at page 1 when it failed, or None once it succeeded or ran out of attempts
+        
+        Page 1 sizes the whole crawl, so it is retried under the controller like any other chunk.
+        """
+        
+        if first.unchanged or (first.status == 200 and first.data):
+            return None
+        
+        chunk = first.chunk
+        reason = first.error or "No data"
+        controller.record(first)
+        if self.journal:
+            self.journal.record_failure(chunk.key, reason)
+        
+        if chunk.attempt + 1 >= self.max_attempts:
+            print(f"❌ Page 1 @ limit {chunk.limit}: {reason}, giving up after {self.max_attempts} attempts")
+            return None
+        
+        print(f"🔁 Page 1 @ limit {chunk.limit}: {reason}, retrying (attempt {chunk.attempt + 2})")
+        return chunk._replace(attempt=chunk.attempt + 1)
+    
+    def start_crawl(self, first: ChunkResult) -> Optional[Tuple[ListingCrawlPlan, Dict[int, List[Dict]]]]:
+        """Size the crawl from page 1 and seed the results with its items"""
+        
+        self.manifest_pages = {}
+        self.page_results = {}
+        self.unchanged_offsets = set()
+        self.items_fetched = 0
+        pages = {}
+        
+        if first.unchanged:
+            items = self.previous_page_items(first.chunk)
+            total_restaurants = self.previous_manifest.get('total', 606)
+        elif first.status == 200 and first.data:
+            items = first.data.get('items', [])
+            total_restaurants = first.data.get('total', 606)
+        else:
+            print(f"Failed to get first page: {first.error}")
             return None
+        
+        print(f"Total restaurants: {total_restaurants}")
+        print(f"Pages at the starting limit of {self.page_limit}: "
+              f"{(total_restaurants + self.page_limit - 1) // self.page_limit}")
+        
+        self.manifest_total = total_restaurants
+        self.store_page(first, items, pages)
+        plan = ListingCrawlPlan(total_restaurants, start_offset=len(items), max_attempts=self.max_attempts,
+                                layout=self.previous_layout(len(items), total_restaurants))
+        return plan, pages
+    
+    def previous_page_items(self, chunk: ListingChunk) -> List[Dict]:
+        """Raw items of an unchanged page, straight from the previous run's output"""
+        return [self.previous_raw_by_slug[slug] for slug in self.manifest_entry(chunk)['slugs']]
+    
+    def store_page(self, result: ChunkResult, items: List[Dict], pages: Dict[int, List[Dict]]):
+        """Keep a fetched page for the manifest and for cleaning, or stream it to disk"""
+        
+        offset = result.chunk.offset
+        self.items_fetched += len(items)
+        if result.unchanged:
+            self.unchanged_offsets.add(offset)
+        
+        if self.journal and not result.resumed:
+            self.journal.record(result.chunk.key, {
+                'total': self.manifest_total,
+                'items': items,
+                'hash': result.content_hash,
+                'etag': result.etag,
+                'last_modified': result.last_modified
+            })
+        
+        if self.stream_writer:
+            self.stream_writer.write_page(offset, items, self.iter_clean_restaurants(items))
+        else:
+            pages[offset] = items
+            self.page_results[offset] = items
+        
+        self.manifest_pages[str(offset)] = {
+            'limit': result.chunk.limit,
+            'hash': result.content_hash,
+            'etag': result.etag,
+            'last_modified': result.last_modified,
+            'slugs': [item.get('slug') for item in items]
+        }
+    
+    def handle_chunk_result(self, result: ChunkResult, plan: ListingCrawlPlan,
+                            controller: AdaptiveConcurrencyController, pages: Dict[int, List[Dict]],
+                            retry_delay: float = 0.0):
+        """Store a finished chunk or put it back in the queue, delaying its retry by retry_delay"""
+        
+        chunk = result.chunk
+        controller.record(result)
+        
+        if result.unchanged:
+            plan.complete()
+            items = self.previous_page_items(chunk)
+            self.store_page(result, items, pages)
+            print(f"♻️  Items {chunk.offset + 1}-{chunk.offset + len(items)} "
+                  f"(page {chunk.page} @ limit {chunk.limit}): unchanged")
+            return
+        
+        if result.status == 200 and result.data and 'items' in result.data:
+            items = result.data['items']
+            expected = min(chunk.limit, plan.total - chunk.offset)
+            
+            # A capped page size shifts the page boundaries, so the items belong to another
+            # slice; near the end of the listing that slice can even be longer than expected
+            if len(items) != expected and chunk.limit > controller.base_limit:
+                print(f"⚠️  Page size {chunk.limit} not honoured ({len(items)}/{expected} items), lowering limit")
+                controller.cap_page_limit(chunk.limit)
+                plan.requeue_split(chunk, controller.base_limit)
+                return
+            
+            # A short last page at a size never seen in full cannot tell a capped API apart
+            if len(items) < chunk.limit and chunk.limit > controller.confirmed_limit:
+                print(f"⚠️  Page size {chunk.limit} unconfirmed on a short page, refetching at {controller.base_limit}")
+                plan.requeue_split(chunk, controller.base_limit)
+                return
+            
+            if len(items) == chunk.limit:
+                controller.confirm_page_limit(chunk.limit)
+            
+            plan.complete()
+            self.store_page(result, items, pages)
+            print(f"✅ Items {chunk.offset + 1}-{chunk.offset + len(items)} "
+                  f"(page {chunk.page} @ limit {chunk.limit}): {len(items)} restaurants")
+            return
+        
+        reason = result.error or "No data"
+        if self.journal:
+            self.journal.record_failure(chunk.key, reason)
+        
+        if plan.requeue(chunk, retry_delay):
+            print(f"🔁 Page {chunk.page} @ limit {chunk.limit}: {reason}, re-queued (attempt {chunk.attempt + 1})")
+        else:
+            print(f"❌ Page {chunk.page} @ limit {chunk.limit}: {reason}, giving up after {plan.max_attempts} attempts")
+    
+    def finish_crawl(self, plan: ListingCrawlPlan, pages: Dict[int, List[Dict]]) -> List[Dict[str, Any]]:
+        """Assemble the pages in listing order"""
+        
+        all_restaurants = []
+        for offset in sorted(pages):
+            all_restaurants.extend(pages[offset])
+        
+        self.lost_chunks = plan.lost
+        if plan.lost:
+            print(f"⚠️  {len(plan.lost)} chunk(s) could not be fetched: "
+                  f"{[f'items {c.offset + 1}-{c.offset + c.limit}' for c in plan.lost]}")
+        
+        fetched_pages = len(self.manifest_pages)
+        changed = fetched_pages - len(self.unchanged_offsets)
+        print(f"\n📊 Pages changed: {changed}/{fetched_pages} ({len(self.unchanged_offsets)} reused from the previous run)")
+        
+        print(f"\n🎉 Completed! Got {self.items_fetched} total restaurants")
+        return all_restaurants
+    
+    async def crawl_worker(self, client: "httpx.AsyncClient", plan: ListingCrawlPlan,
+                           controller: AdaptiveConcurrencyController, pages: Dict[int, List[Dict]],
+                           condition: asyncio.Condition):
+        """Pull chunks while the controller allows another request in flight"""
+        
+        while True:
+            async with condition:
+                while True:
+                    if plan.is_done():
+                        condition.notify_all()
+                        return
+                    if plan.in_flight < controller.concurrency and plan.has_pending():
+                        chunk = plan.next_chunk(controller.page_limit, controller.base_limit)
+                        break
+                    await condition.wait()
+            
+            result = await self.fetch_chunk_async(client, chunk)
+            
+            # Hold the slot through the back-off so throttling also lowers the effective rate
+            if not result.ok and controller.backoff_delay:
+                await asyncio.sleep(controller.backoff_delay)
+            
+            async with condition:
+                self.handle_chunk_result(result, plan, controller, pages)
+                condition.notify_all()
+
+    async def get_all_restaurants_async(self) -> List[Dict[str, Any]]:
+        """Scrape all restaurants with asyncio on one keep-alive connection pool"""
+        
+        print(f"🚀 Async scraping all restaurants (HTTP/2: {'on' if HTTP2_AVAILABLE else 'off'})...")
+        
+        controller = self.new_controller()
+        
+        # One pool sized to the controller's ceiling, so every request reuses a warm connection
+        limits = httpx.Limits(
+            max_connections=controller.max_concurrency,
+            max_keepalive_connections=controller.max_concurrency
+        )
+        
+        async with httpx.AsyncClient(
+            headers=self.headers,
+            http2=HTTP2_AVAILABLE,
+            limits=limits,
+            timeout=self.request_timeout
+        ) as client:
+            # First, get page 1 to find total count
+            first = await self.fetch_chunk_async(client, ListingChunk(0, self.page_limit))
+            retry = self.retry_first_chunk(first, controller)
+            while retry:
+                await asyncio.sleep(controller.backoff_delay)
+                first = await self.fetch_chunk_async(client, retry)
+                retry = self.retry_first_chunk(first, controller)
+            
+            started = self.start_crawl(first)
+            if not started:
+                return []
+            plan, pages = started
+            
+            condition = asyncio.Condition()
+            await asyncio.gather(*[
+                self.crawl_worker(client, plan, controller, pages, condition)
+                for _ in range(controller.max_concurrency)
+            ])
+        
+        return self.finish_crawl(plan, pages)
+
+    def get_all_restaurants(self) -> List[Dict[str, Any]]:
+        """Scrape all restaurants, preferring the async engine when httpx is installed"""
+        
+        if httpx is not None:
+            return asyncio.run(self.get_all_restaurants_async())
+        
+        print("⚠️  httpx not installed, falling back to threaded scraping")
+        return self.get_all_restaurants_fast()
 
     def get_all_restaurants_fast(self) -> List[Dict[str, Any]]:
         """Scrape all restaurants using parallel requests"""
         
         print("🚀 Fast scraping all restaurants...")
         
+        controller = self.new_controller()
+        
         # First, get page 1 to find total count
-        first_page = self.get_restaurants_page(1)
-        if not first_page:
-            print("Failed to get first page")
+        first = self.fetch_chunk(ListingChunk(0, self.page_limit))
+        retry = self.retry_first_chunk(first, controller)
+        while retry:
+            time.sleep(controller.backoff_delay)
+            first = self.fetch_chunk(retry)
+            retry = self.retry_first_chunk(first, controller)
+        
+        started = self.start_crawl(first)
+        if not started:
             return []
+        plan, pages = started
+        
+        # Keep as many requests in flight as the controller currently allows
+        with ThreadPoolExecutor(max_workers=controller.max_concurrency) as executor:
+            in_flight = set()
             
-        total_restaurants = first_page.get('total', 606)
-        restaurants_per_page = len(first_page.get('items', []))
-        total_pages = (total_restaurants + restaurants_per_page - 1) // restaurants_per_page
+            while not plan.is_done():
+                while len(in_flight) < controller.concurrency and plan.has_pending():
+                    chunk = plan.next_chunk(controller.page_limit, controller.base_limit)
+                    if chunk is None:
+                        break  # Only retries still waiting out their back-off
+                    in_flight.add(executor.submit(self.fetch_chunk, chunk))
+                
+                if not in_flight:
+                    time.sleep(plan.retry_wait() or 0.0)
+                    continue
+                
+                # Wake up when a delayed retry becomes due, not only when a request finishes;
+                # failed chunks wait in the queue instead of blocking this loop
+                done, in_flight = wait(in_flight, timeout=plan.retry_wait(), return_when=FIRST_COMPLETED)
+                for future in done:
+                    self.handle_chunk_result(future.result(), plan, controller, pages,
+                                             retry_delay=controller.backoff_delay)
         
-        print(f"Total restaurants: {total_restaurants}")
-        print(f"Total pages to fetch: {total_pages}")
-        
-        all_restaurants = first_page.get('items', [])
-        
-        # Parallel fetch remaining pages
-        with ThreadPoolExecutor(max_workers=8) as executor:  # 8 concurrent requests
-            # Submit all page requests
-            future_to_page = {
-                executor.submit(self.get_restaurants_page, page): page 
-                for page in range(2, total_pages + 1)
-            }
-            
-            # Collect results as they complete
-            for future in as_completed(future_to_page):
-                page_num = future_to_page[future]
-                try:
-                    data = future.result()
-                    if data and 'items' in data:
-                        restaurants = data['items']
-                        all_restaurants.extend(restaurants)
-                        print(f"✅ Page {page_num}: {len(restaurants)} restaurants")
-                    else:
-                        print(f"❌ Page {page_num}: No data")
-                except Exception as e:
-                    print(f"❌ Page {page_num}: {e}")
-        
-        print(f"\n🎉 Completed! Got {len(all_restaurants)} total restaurants")
-        return all_restaurants
-
-
+        return self.finish_crawl(plan, pages)
 
     def clean_restaurant_data(self, restaurants: List[Dict]) -> List[Dict]:
         """Extract and clean the essential data for each restaurant"""
-        
-        cleaned = []
+        return list(self.iter_clean_restaurants(restaurants))
+    
+    def iter_clean_restaurants(self, restaurants: Iterable[Dict]) -> Iterator[Dict]:
+        """Clean restaurants one at a time as they are consumed"""
         
         for restaurant in restaurants:
             try:
@@ -122,14 +873,34 @@ class FastRestaurantWeekScraper:
                     'primary_location': restaurant.get('primaryLocation', '')
                 }
                 
-                cleaned.append(clean_data)
-                
             except Exception as e:
                 print(f"Error cleaning restaurant data: {e}")
                 continue
-                
+            
+            yield clean_data
+    
+    def clean_crawled_pages(self) -> List[Dict]:
+        """Clean the last crawl page by page, reusing cleaned items of unchanged pages"""
+        
+        cleaned = []
+        for offset in sorted(self.page_results):
+            items = self.page_results[offset]
+            if offset in self.unchanged_offsets:
+                cleaned.extend(self.previous_clean_by_slug[item.get('slug')] for item in items)
+            else:
+                cleaned.extend(self.clean_restaurant_data(items))
         return cleaned
     
+    def save_manifest(self, filename: str):
+        """Save the per-page manifest used by the next delta crawl"""
+        
+        manifest = {
+            'scraped_at': time.strftime('%Y-%m-%d %H:%M:%S'),
+            'total': self.manifest_total,
+            'pages': self.manifest_pages
+        }
+        self.save_data(manifest, filename)
+    
     def save_data(self, restaurants: List[Dict], filename: str):
         """Save restaurant data to JSON file"""
         
@@ -141,39 +912,98 @@ class FastRestaurantWeekScraper:
         except Exception as e:
             print(f"Error saving data: {e}")
 
+RAW_FILE = "../data/NYCRestaurantWeek/1_ScrapedRaw.json"
+CLEAN_FILE = "../data/NYCRestaurantWeek/1_Scraped.json"
+MANIFEST_FILE = "../data/NYCRestaurantWeek/1_ScrapeManifest.json"
+RAW_NDJSON_FILE = "../data/NYCRestaurantWeek/1_ScrapedRaw.ndjson"
+CLEAN_NDJSON_FILE = "../data/NYCRestaurantWeek/1_Scraped.ndjson"
+
+def print_borough_summary(restaurants: Iterable[Dict]):
+    """Print restaurant counts per borough"""
+    
+    boroughs = {}
+    for restaurant in restaurants:
+        borough = restaurant.get('borough', 'Unknown')
+        if borough:  # Only count non-empty boroughs
+            boroughs[borough] = boroughs.get(borough, 0) + 1
+    
+    print(f"\n📍 By Borough:")
+    for borough, count in sorted(boroughs.items()):
+        print(f"   {borough}: {count}")
+
+def finish_journal(scraper: FastRestaurantWeekScraper, journal: CheckpointJournal):
+    """Clear the journal after a complete crawl; keep it when pages were lost so --resume can finish them"""
+    
+    if scraper.lost_chunks:
+        print(f"💡 {len(scraper.lost_chunks)} chunk(s) missing, re-run with --resume to fetch only those")
+    else:
+        journal.reset()
+    journal.close()
+
 def main():
     """Main scraping function using parallel requests"""
     
+    parser = argparse.ArgumentParser(description="Scrape the NYC Restaurant Week listing")
+    parser.add_argument('--full', action='store_true',
+                        help="Ignore the previous run's manifest and re-process every page")
+    parser.add_argument('--stream', action='store_true',
+                        help="Write pages to NDJSON as they arrive instead of holding the crawl in memory "
+                             "(always a full crawl)")
+    parser.add_argument('--resume', action='store_true',
+                        help="Reuse pages journaled by an interrupted run and only fetch missing or failed ones")
+    args = parser.parse_args()
+    
     scraper = FastRestaurantWeekScraper()
+    journal = open_journal('scrape', args.resume)
+    scraper.use_journal(journal, args.resume)
     
-    print("🚀 Starting parallel scraping using parallel requests (8 concurrent threads)...")
+    print(f"🚀 Starting adaptive parallel scraping ({scraper.initial_concurrency}-{scraper.max_concurrency} concurrent requests)...")
+    
+    if args.stream:
+        start_time = time.time()
+        with StreamingPageWriter(RAW_NDJSON_FILE, CLEAN_NDJSON_FILE) as writer:
+            scraper.stream_writer = writer
+            scraper.get_all_restaurants()
+        end_time = time.time()
+        
+        if not writer.items_written:
+            print("❌ Scraping failed")
+            return
+        
+        print(f"\n⏱️  Scraping completed in {end_time - start_time:.1f} seconds!")
+        print(f"📊 Total restaurants: {writer.items_written}")
+        print(f"💾 Pages streamed to {RAW_NDJSON_FILE} and {CLEAN_NDJSON_FILE}")
+        
+        writer.export(RAW_FILE, CLEAN_FILE)
+        scraper.save_manifest(MANIFEST_FILE)
+        finish_journal(scraper, journal)
+        print_borough_summary(iter_ndjson(CLEAN_NDJSON_FILE))
+        return
+    
+    if not args.full:
+        scraper.load_previous_run(MANIFEST_FILE, RAW_FILE, CLEAN_FILE)
     
     start_time = time.time()
-    raw_restaurants = scraper.get_all_restaurants_fast()
+    raw_restaurants = scraper.get_all_restaurants()
     end_time = time.time()
     
     if raw_restaurants:
         print(f"\n⏱️  Scraping completed in {end_time - start_time:.1f} seconds!")
         print(f"📊 Total restaurants: {len(raw_restaurants)}")
         
-        # Clean and save data
-        clean_restaurants = scraper.clean_restaurant_data(raw_restaurants)
-        scraper.save_data(raw_restaurants, "../data/NYCRestaurantWeek/1_ScrapedRaw.json")
-        scraper.save_data(clean_restaurants, "../data/NYCRestaurantWeek/1_Scraped.json")
+        # Clean changed pages only, then save data and the manifest for the next run
+        clean_restaurants = scraper.clean_crawled_pages()
+        scraper.save_data(raw_restaurants, RAW_FILE)
+        scraper.save_data(clean_restaurants, CLEAN_FILE)
+        scraper.save_manifest(MANIFEST_FILE)
+        finish_journal(scraper, journal)
         
         # Print summary stats
-        boroughs = {}
-        for restaurant in clean_restaurants:
-            borough = restaurant.get('borough', 'Unknown')
-            if borough:  # Only count non-empty boroughs
-                boroughs[borough] = boroughs.get(borough, 0) + 1
-        
-        print(f"\n📍 By Borough:")
-        for borough, count in sorted(boroughs.items()):
-            print(f"   {borough}: {count}")
+        print_borough_summary(clean_restaurants)
     
     else:
         print("❌ Scraping failed")
+        journal.close()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -1,103 +1,151 @@
 import json
-import requests
-import time
-import threading
-from typing import List, Dict, Optional, Tuple
+import argparse
+from typing import List, Dict, Optional, Tuple, NamedTuple, Any
 import re
-from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from checkpoint import open_journal, close_journal
+from page_cache import add_cache_arguments, cache_from_args
+from html_backends import DEFAULT_BACKEND, PREFERRED_BACKENDS, set_default_backend, default_backend
+from restaurant_pages import RestaurantPagePipeline, save_page_extractions
+
+# The venue object embedded in the page's JSON, found with one scan for its first key
+VENUE_KEY_PATTERN = re.compile(r'"venueAddress"\s*:')
+JSON_DECODER = json.JSONDecoder()
+
+# Regex strategies, used only when the venue object cannot be parsed
+VENUE_PATTERN = re.compile(r'"venueAddress":"([^"]+)"[^}]*"location":\s*\{\s*"lon":\s*([+-]?\d+\.?\d*)\s*,\s*"lat":\s*([+-]?\d+\.?\d*)\s*\}')
+LOCATION_PATTERNS = [
+    # (pattern, whether the first group is the longitude)
+    (re.compile(r'"location":\s*\{\s*"lon":\s*([+-]?\d+\.?\d*)\s*,\s*"lat":\s*([+-]?\d+\.?\d*)\s*\}'), True),
+    (re.compile(r'"lat":\s*([+-]?\d+\.?\d*)\s*,\s*"lon":\s*([+-]?\d+\.?\d*)'), False),
+    (re.compile(r'"longitude":\s*([+-]?\d+\.?\d*)\s*,\s*"latitude":\s*([+-]?\d+\.?\d*)'), True),
+]
+ADDRESS_PATTERNS = [
+    re.compile(r'"address":"([^"]+)"'),
+    re.compile(r'"streetAddress":"([^"]+)"'),
+    re.compile(r'"venueAddress":"([^"]+)"'),
+]
+
+class VenueData(NamedTuple):
+    """Venue object parsed out of a restaurant page"""
+    address_raw: str
+    latitude: Optional[float]
+    longitude: Optional[float]
+    fields: Dict[str, Any]
+
+def find_enclosing_object(page_content: str, position: int) -> Optional[int]:
+    """Index of the '{' opening the JSON object that contains `position`
+    
+    Walks backwards from a key, skipping over string literals, until it reaches an
+    unmatched opening brace. Only the part of the object before the key is scanned.
+    """
+    
+    depth = 0
+    i = position - 1
+    while i >= 0:
+        char = page_content[i]
+        
+        if char == '"':
+            # Skip back to the opening quote of this string, honouring escapes
+            i -= 1
+            while i >= 0:
+                if page_content[i] == '"':
+                    backslashes = 0
+                    while i - 1 - backslashes >= 0 and page_content[i - 1 - backslashes] == '\\':
+                        backslashes += 1
+                    if backslashes % 2 == 0:
+                        break
+                i -= 1
+        elif char == '}' or char == ']':
+            depth += 1
+        elif char == '{' or char == '[':
+            if depth == 0:
+                return i if char == '{' else None
+            depth -= 1
+        elif char == '<':
+            # Left the <script> holding the JSON
+            return None
+        
+        i -= 1
+    
+    return None
+
+def parse_venue_json(page_content: str) -> Optional[VenueData]:
+    """Locate the embedded venue JSON object in one pass and parse it"""
+    
+    match = VENUE_KEY_PATTERN.search(page_content)
+    if not match:
+        return None
+    
+    start = find_enclosing_object(page_content, match.start())
+    if start is None:
+        return None
+    
+    try:
+        venue, _ = JSON_DECODER.raw_decode(page_content, start)
+    except ValueError:
+        return None
+    
+    address_raw = venue.get('venueAddress')
+    if not isinstance(address_raw, str):
+        return None
+    
+    # A malformed page can carry a string or list here; read coordinates only from an object
+    location = venue.get('location')
+    if not isinstance(location, dict):
+        location = {}
+    latitude = location.get('lat', venue.get('latitude'))
+    longitude = location.get('lon', venue.get('longitude'))
+    
+    try:
+        latitude = float(latitude) if latitude is not None else None
+        longitude = float(longitude) if longitude is not None else None
+    except (TypeError, ValueError):
+        latitude = longitude = None
+    
+    return VenueData(address_raw, latitude, longitude, venue)
 
 class RestaurantCoordinateExtractor:
-    def __init__(self):
-        self.headers = {
-            'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-            'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
-            'Accept-Language': 'en-US,en;q=0.5',
-            'Accept-Encoding': 'gzip, deflate',
-            'Connection': 'keep-alive',
-        }
+    def parse_page(self, page_content: str) -> Dict:
+        """Extract coordinates and address from a fetched restaurant page"""
         
-        # Rate limiting for faster but respectful scraping
-        self.request_delay = 0.1  # 100ms between requests
-        self.last_request_time = 0
-        self.request_lock = threading.Lock()
-    
-    def extract_restaurant_data(self, restaurant: Dict) -> Dict:
-        """Extract coordinates and address from restaurant's page source"""
+        # Extract JSON data from page source
+        extracted_data = self.extract_json_data(page_content, '')
         
-        slug = restaurant.get('slug', '')
-        restaurant_name = restaurant.get('name', 'Unknown')
+        if extracted_data['extraction_success']:
+            print(f"  ✅ Found: {extracted_data['address']} -> ({extracted_data['latitude']:.4f}, {extracted_data['longitude']:.4f})")
+        else:
+            print(f"  ❌ {extracted_data['error']}")
         
-        if not slug:
-            print(f"  ❌ No slug found")
-            return {
-                'address': None,
-                'latitude': None,
-                'longitude': None
-            }
+        # Remove tracking fields before returning
+        return {
+            'address': extracted_data.get('address'),
+            'latitude': extracted_data.get('latitude'),
+            'longitude': extracted_data.get('longitude'),
+            'extraction_method': extracted_data.get('extraction_method'),
+        }
+    
+    def extract_json_data(self, page_content: str, restaurant_name: str) -> Dict:
+        """Extract address and coordinates from JSON in page source"""
         
-        restaurant_url = f"https://www.nyctourism.com/restaurant-week/{slug}/"
+        # Strategy 0: Parse the embedded venue object and read its fields directly
+        venue = parse_venue_json(page_content)
         
-        try:
-            # Rate limiting
-            with self.request_lock:
-                current_time = time.time()
-                time_since_last = current_time - self.last_request_time
-                
-                if time_since_last < self.request_delay:
-                    sleep_time = self.request_delay - time_since_last
-                    time.sleep(sleep_time)
-                
-                self.last_request_time = time.time()
-            
-            print(f"  🌐 Fetching: {restaurant_url}")
-            
-            response = requests.get(restaurant_url, headers=self.headers, timeout=10)
-            
-            if response.status_code == 200:
-                page_content = response.text
-                
-                # Extract JSON data from page source
-                extracted_data = self.extract_json_data(page_content, restaurant_name)
-                
-                if extracted_data['extraction_success']:
-                    print(f"  ✅ Found: {extracted_data['address']} -> ({extracted_data['latitude']:.4f}, {extracted_data['longitude']:.4f})")
-                else:
-                    print(f"  ❌ {extracted_data['error']}")
-                
-                # Remove tracking fields before returning
-                clean_data = {
-                    'address': extracted_data.get('address'),
-                    'latitude': extracted_data.get('latitude'),
-                    'longitude': extracted_data.get('longitude'),
-                }
-                return clean_data
-                
-            else:
-                print(f"  ❌ HTTP {response.status_code}")
-                return {
-                    'address': None,
-                    'latitude': None,
-                    'longitude': None
-                }
-                
-        except Exception as e:
-            print(f"  ❌ Error: {e}")
+        if venue and venue.latitude is not None and venue.longitude is not None:
             return {
-                'address': None,
-                'latitude': None,
-                'longitude': None
+                'address': self.clean_venue_address(venue.address_raw),
+                'latitude': venue.latitude,
+                'longitude': venue.longitude,
+                'extraction_method': 'venue_json',
+                'extraction_success': True,
+                'error': None
             }
-    
-    def extract_json_data(self, page_content: str, restaurant_name: str) -> Dict:
-        """Extract address and coordinates from JSON in page source"""
         
         # Strategy 1: Look for venueAddress and location pattern
-        venue_pattern = r'"venueAddress":"([^"]+)"[^}]*"location":\s*\{\s*"lon":\s*([+-]?\d+\.?\d*)\s*,\s*"lat":\s*([+-]?\d+\.?\d*)\s*\}'
+        match = VENUE_PATTERN.search(page_content)
         
-        matches = re.findall(venue_pattern, page_content)
-        
-        if matches:
-            address_raw, lon, lat = matches[0]
+        if match:
+            address_raw, lon, lat = match.groups()
             
             # Clean up the address (it's often formatted like "320 Atlantic Ave.,Brooklyn,11201,NY")
             address = self.clean_venue_address(address_raw)
@@ -106,35 +154,29 @@ class RestaurantCoordinateExtractor:
                 'address': address,
                 'latitude': float(lat),
                 'longitude': float(lon),
+                'extraction_method': 'venueAddress_location_pattern',
                 'extraction_success': True,
                 'error': None
             }
         
         # Strategy 2: Look for broader location patterns
-        location_patterns = [
-            r'"location":\s*\{\s*"lon":\s*([+-]?\d+\.?\d*)\s*,\s*"lat":\s*([+-]?\d+\.?\d*)\s*\}',
-            r'"lat":\s*([+-]?\d+\.?\d*)\s*,\s*"lon":\s*([+-]?\d+\.?\d*)',
-            r'"longitude":\s*([+-]?\d+\.?\d*)\s*,\s*"latitude":\s*([+-]?\d+\.?\d*)',
-        ]
-        
-        for i, pattern in enumerate(location_patterns):
-            matches = re.findall(pattern, page_content)
+        for i, (pattern, lon_first) in enumerate(LOCATION_PATTERNS):
+            match = pattern.search(page_content)
             
-            if matches:
-                if i == 0:  # lon, lat format
-                    lon, lat = matches[0]
-                elif i == 1:  # lat, lon format  
-                    lat, lon = matches[0]
-                elif i == 2:  # longitude, latitude format
-                    lon, lat = matches[0]
+            if match:
+                if lon_first:  # lon, lat / longitude, latitude format
+                    lon, lat = match.groups()
+                else:  # lat, lon format
+                    lat, lon = match.groups()
                 
-                # Try to find address separately
-                address = self.find_address_in_content(page_content)
+                # Try to find address separately, from the venue object if it parsed
+                address = self.clean_venue_address(venue.address_raw) if venue else self.find_address_in_content(page_content)
                 
                 return {
                     'address': address,
                     'latitude': float(lat),
                     'longitude': float(lon),
+                    'extraction_method': f'location_pattern_{i + 1}',
                     'extraction_success': True,
                     'error': None,
                     
@@ -145,6 +187,7 @@ class RestaurantCoordinateExtractor:
             'address': None,
             'latitude': None,
             'longitude': None,
+            'extraction_method': None,
             'extraction_success': False,
             'error': 'No coordinate patterns found in page source',
            
@@ -178,71 +221,36 @@ class RestaurantCoordinateExtractor:
         """Find address in page content using various patterns"""
         
         # Look for address patterns
-        address_patterns = [
-            r'"address":"([^"]+)"',
-            r'"streetAddress":"([^"]+)"',
-            r'"venueAddress":"([^"]+)"',
-        ]
-        
-        for pattern in address_patterns:
-            matches = re.findall(pattern, page_content)
-            if matches:
-                return matches[0]
+        for pattern in ADDRESS_PATTERNS:
+            match = pattern.search(page_content)
+            if match:
+                return match.group(1)
         
         return None
     
-    def process_restaurant_with_progress(self, restaurant_data) -> Dict:
-        """Process a single restaurant with progress tracking"""
-        
-        index, total, restaurant = restaurant_data
-        restaurant_name = restaurant.get('name', 'Unknown')
-        
-        print(f"[{index}/{total}] {restaurant_name}")
+    def extract_all_coordinates(self, restaurants: List[Dict],
+                                pipeline: RestaurantPagePipeline) -> Tuple[List[Dict], Dict[str, Dict]]:
+        """Extract coordinates for all restaurants from the shared page pipeline
         
-        extracted_data = self.extract_restaurant_data(restaurant)
-        
-        # Add extracted data to restaurant
-        restaurant_copy = restaurant.copy()
-        restaurant_copy.update(extracted_data)
-        
-        return restaurant_copy
-    
-    def extract_all_coordinates(self, restaurants: List[Dict]) -> List[Dict]:
-        """Extract coordinates for all restaurants"""
+        Returns the restaurants with coordinates and every page's extractions, so the
+        characteristics stage can reuse the same fetch.
+        """
         
         print(f"📍 Starting coordinate extraction for {len(restaurants)} restaurants...")
-        print(f"⏱️  Estimated time: ~{len(restaurants) * 0.5 / 60:.1f} minutes")
-        
-        results = []
+        print(f"⏱️  Estimated time: ~{len(restaurants) / pipeline.rate_limiter.rate / 60:.1f} minutes")
         
-        # Prepare data with progress info
-        restaurant_data = [(i+1, len(restaurants), restaurant) 
-                          for i, restaurant in enumerate(restaurants)]
+        page_results = pipeline.run(restaurants)
         
-        # Use parallel processing for speed
-        with ThreadPoolExecutor(max_workers=10) as executor:
-            future_to_restaurant = {
-                executor.submit(self.process_restaurant_with_progress, data): data[2]['name']
-                for data in restaurant_data
-            }
+        results = []
+        for restaurant in restaurants:
+            coordinates = page_results.get(restaurant.get('slug'), {}).get('coordinates', {})
+            restaurant_copy = restaurant.copy()
             
-            for future in as_completed(future_to_restaurant):
-                restaurant_name = future_to_restaurant[future]
-                try:
-                    result = future.result()
-                    results.append(result)
-                    
-                    # Progress update
-                    if len(results) % 25 == 0:
-                        print(f"\n📊 Progress: {len(results)}/{len(restaurants)}")
-                        
-                except Exception as e:
-                    print(f"❌ Error processing {restaurant_name}: {e}")
-        
-        # Sort results to maintain original order
-        results.sort(key=lambda x: next(i for i, r in enumerate(restaurants) if r['name'] == x['name']))
+            # extraction_method is reported in the summary, not saved with the restaurant
+            restaurant_copy.update({field: coordinates.get(field) for field in ('address', 'latitude', 'longitude')})
+            results.append(restaurant_copy)
         
-        return results
+        return results, page_results
     
     def save_results(self, restaurants: List[Dict], filename: str = "../data/NYCRestaurantWeek/2_Geocoded.json"):
         """Save results to JSON file"""
@@ -255,9 +263,31 @@ class RestaurantCoordinateExtractor:
         except Exception as e:
             print(f"Error saving results: {e}")
 
+def extract_coordinates_from_html(page_content: str) -> Dict:
+    """Page pipeline extractor: address and coordinates"""
+    return RestaurantCoordinateExtractor().parse_page(page_content)
+
 def main():
     """Main function"""
     
+    parser = argparse.ArgumentParser(description="Fetch every restaurant page once and extract coordinates "
+                                                 "(characteristics are extracted from the same fetch)")
+    parser.add_argument('--resume', action='store_true',
+                        help="Reuse restaurants journaled by an interrupted run and only fetch missing or failed ones")
+    parser.add_argument('--html-backend', choices=PREFERRED_BACKENDS, default=DEFAULT_BACKEND,
+                        help="HTML parser for the characteristics extracted from the same fetch "
+                             f"(default: {DEFAULT_BACKEND})")
+    parser.add_argument('--parse-workers', type=int, default=None,
+                        help="Processes parsing fetched pages (default: one per CPU; 0 parses in the fetch threads)")
+    add_cache_arguments(parser)
+    args = parser.parse_args()
+    
+    try:
+        set_default_backend(args.html_backend)
+    except ValueError as e:
+        parser.error(str(e))
+    print(f"🧩 HTML backend: {default_backend()}")
+    
     # Load the cleaned restaurant data
     try:
         # Try different possible paths
@@ -295,14 +325,20 @@ def main():
         print(f"❌ Error loading data: {e}")
         return
     
-    # Initialize extractor
+    # Initialize extractor and the page pipeline shared with the characteristics stage
     extractor = RestaurantCoordinateExtractor()
+    pipeline = RestaurantPagePipeline(['coordinates', 'characteristics'], cache=cache_from_args(args),
+                                      parse_workers=args.parse_workers)
+    journal = open_journal('pages', args.resume)
+    pipeline.use_journal(journal, args.resume)
     
-    # Extract coordinates
-    restaurants_with_coords = extractor.extract_all_coordinates(restaurants)
+    # Extract coordinates (and characteristics, from the same page fetch)
+    restaurants_with_coords, page_results = extractor.extract_all_coordinates(restaurants, pipeline)
     
     # Save results
     extractor.save_results(restaurants_with_coords)
+    save_page_extractions(page_results)
+    close_journal(journal)
     
     # Print summary
     print(f"\n📊 Summary:")
@@ -317,7 +353,8 @@ def main():
     methods = {}
     for restaurant in restaurants_with_coords:
         if restaurant.get('latitude') is not None and restaurant.get('longitude') is not None:
-            method = restaurant.get('extraction_method', 'unknown')
+            coordinates = page_results.get(restaurant.get('slug'), {}).get('coordinates', {})
+            method = coordinates.get('extraction_method') or 'unknown'
             methods[method] = methods.get(method, 0) + 1
     
     print(f"\n🔍 Extraction methods used:")
@@ -327,10 +364,12 @@ def main():
     
     # Show which strategies are working
     print(f"\n📈 Strategy Analysis:")
+    venue_json_count = methods.get('venue_json', 0)
     venue_address_count = methods.get('venueAddress_location_pattern', 0)
     location_patterns_count = sum(count for method, count in methods.items() if 'location_pattern_' in method)
     failed_count = sum(1 for r in restaurants_with_coords if r.get('latitude') is None or r.get('longitude') is None)
     
+    print(f"   Strategy 0 (embedded venue JSON): {venue_json_count}")
     print(f"   Strategy 1 (venueAddress + location): {venue_address_count}")
     print(f"   Strategy 2 (location patterns only): {location_patterns_count}")
     print(f"   Failed extractions: {failed_count}")
@@ -1,285 +1,104 @@
 import json
-import requests
-import time
-from typing import List, Dict, Optional, Tuple
+import argparse
+from typing import List, Dict
 import re
-from concurrent.futures import ThreadPoolExecutor, as_completed
-import threading
-from bs4 import BeautifulSoup
+
+from checkpoint import open_journal, close_journal
+from page_cache import add_cache_arguments, cache_from_args
+from page_view import Anchor, PageView
+from extraction_rules import AnchorRule, Field, RegexRule, RuleRegistry
+from html_backends import DEFAULT_BACKEND, PREFERRED_BACKENDS, parse_page_view, set_default_backend, default_backend
+from restaurant_pages import RestaurantPagePipeline, load_page_extractions
+
+def clean_phone(phone: str) -> str:
+    """Clean up the phone number"""
+    return re.sub(r'[\s.-]', '', phone)
+
+def is_menu_link(link: Anchor) -> bool:
+    """A "See Menu" style link pointing at the S3 menu bucket"""
+    link_text = link.text.lower().strip()
+    return (any(keyword in link_text for keyword in ['menu', 'see menu', 'view menu', 'download menu'])
+            and 's3.amazonaws.com' in link.href)
+
+# Every characteristic and its rules, in priority order; new fields only need an entry here
+CHARACTERISTICS = RuleRegistry([
+    # Phone numbers in the page text, cleaned of separators
+    Field('telephone', [
+        RegexRule(r'\(?\d{3}\)?[\s.-]?\d{3}[\s.-]?\d{4}', transform=clean_phone),  # (123) 456-7890 or 123-456-7890
+        RegexRule(r'\+\d{1,3}[\s.-]?\d{3}[\s.-]?\d{3}[\s.-]?\d{4}', transform=clean_phone),  # International format
+    ]),
+    # $, $$, $$$ or $$$$ next to a price label, else any $ sign
+    Field('price_range', [
+        RegexRule(r'Price[:\s]*(\$+)', re.IGNORECASE, group=1),
+        RegexRule(r'Cost[:\s]*(\$+)', re.IGNORECASE, group=1),
+        RegexRule(r'(\$+)\s*price', re.IGNORECASE, group=1),
+        RegexRule(r'(\$+)\s*range', re.IGNORECASE, group=1),
+        RegexRule(r'\$'),
+    ]),
+    # Links first, then URLs mentioned in the text
+    Field('facebook_url', [
+        AnchorRule(lambda link: 'facebook.com' in link.href or 'fb.com' in link.href),
+        RegexRule(r'https?://(?:www\.)?facebook\.com/[^\s"<>]+'),
+        RegexRule(r'https?://(?:www\.)?fb\.com/[^\s"<>]+'),
+    ]),
+    Field('instagram_url', [
+        AnchorRule(lambda link: 'instagram.com' in link.href or 'ig.com' in link.href),
+        RegexRule(r'https?://(?:www\.)?instagram\.com/[^\s"<>]+'),
+        RegexRule(r'https?://(?:www\.)?ig\.com/[^\s"<>]+'),
+    ]),
+    # S3 menu: a "See Menu" button, then any S3 link, then S3 URLs in the text
+    Field('menu_url', [
+        AnchorRule(is_menu_link),
+        AnchorRule(lambda link: 's3.amazonaws.com' in link.href),
+        RegexRule(r'https?://[^"\s<>]*s3\.amazonaws\.com[^"\s<>]*'),
+        RegexRule(r'https?://[^"\s<>]*nyc-tourism-public\.s3\.amazonaws\.com[^"\s<>]*'),
+    ]),
+])
 
 class RestaurantCharacteristicsExtractor:
-    def __init__(self):
-        self.request_delay = 0.2  
-        self.last_request_time = 0
-        self.request_lock = threading.Lock()
-        
-        # Headers for web scraping
-        self.scraping_headers = {
-            'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-            'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
-            'Accept-Language': 'en-US,en;q=0.5',
-            'Accept-Encoding': 'gzip, deflate',
-            'Connection': 'keep-alive',
-        }
-    
-    def extract_restaurant_characteristics(self, restaurant: Dict) -> Dict:
-        """Extract specific characteristics from restaurant's individual page"""
-        
-        slug = restaurant.get('slug', '')
-        if not slug:
-            print(f"  No slug found for {restaurant['name']}")
-            return restaurant
-        
-        # Construct the restaurant page URL
-        restaurant_url = f"https://www.nyctourism.com/restaurant-week/{slug}/"
-        
-        try:
-            # Rate limiting
-            with self.request_lock:
-                current_time = time.time()
-                time_since_last = current_time - self.last_request_time
-                
-                if time_since_last < self.request_delay:
-                    sleep_time = self.request_delay - time_since_last
-                    time.sleep(sleep_time)
-                
-                self.last_request_time = time.time()
-            
-            response = requests.get(
-                restaurant_url, 
-                headers=self.scraping_headers, 
-                timeout=10  # Reduced timeout
-            )
-            
-            if response.status_code == 200:
-                soup = BeautifulSoup(response.content, 'html.parser')
-                
-                # Extract characteristics
-                characteristics = {}
-                
-                # 1. Extract telephone number
-                phone = self.extract_telephone(soup)
-                if phone:
-                    characteristics['telephone'] = phone
-                
-                # 2. Extract price range
-                price_range = self.extract_price_range(soup)
-                if price_range:
-                    characteristics['price_range'] = price_range
-                
-                # 3. Extract Facebook URL
-                facebook_url = self.extract_facebook_url(soup)
-                if facebook_url:
-                    characteristics['facebook_url'] = facebook_url
-                
-                # 4. Extract Instagram URL
-                instagram_url = self.extract_instagram_url(soup)
-                if instagram_url:
-                    characteristics['instagram_url'] = instagram_url
-                
-                # 5. Extract menu URL from S3 bucket
-                menu_url = self.extract_menu_url(soup)
-                if menu_url:
-                    characteristics['menu_url'] = menu_url
-                
-                # Update restaurant with new characteristics
-                restaurant_copy = restaurant.copy()
-                restaurant_copy.update(characteristics)
-                
-                # Print what we found
-                if characteristics:
-                    print(f"  ✅ Found: {list(characteristics.keys())}")
-                else:
-                    print(f"  ❌ No characteristics found")
-                
-                return restaurant_copy
-                    
-            else:
-                print(f"  ❌ HTTP {response.status_code}")
-                return restaurant
-                
-        except Exception as e:
-            print(f"  ❌ Error scraping page: {e}")
-            return restaurant
-    
-    def extract_telephone(self, soup: BeautifulSoup) -> Optional[str]:
-        """Extract telephone number from the page"""
-        # Look for phone numbers in various formats
-        phone_patterns = [
-            r'\(?\d{3}\)?[\s.-]?\d{3}[\s.-]?\d{4}',  # (123) 456-7890 or 123-456-7890
-            r'\+\d{1,3}[\s.-]?\d{3}[\s.-]?\d{3}[\s.-]?\d{4}',  # International format
-        ]
+    def parse_page(self, page_content: str) -> Dict:
+        """Extract specific characteristics from a fetched restaurant page"""
         
-        # Search in all text
-        page_text = soup.get_text()
+        # Parse once; every extractor reads the same text and anchor list
+        characteristics = self.extract_view(parse_page_view(page_content))
         
-        for pattern in phone_patterns:
-            matches = re.findall(pattern, page_text)
-            if matches:
-                # Clean up the phone number
-                phone = re.sub(r'[\s.-]', '', matches[0])
-                return phone
+        # Print what we found
+        if characteristics:
+            print(f"  ✅ Found: {list(characteristics.keys())}")
+        else:
+            print(f"  ❌ No characteristics found")
         
-        return None
+        return characteristics
     
-    def extract_price_range(self, soup: BeautifulSoup) -> Optional[str]:
-        """Extract price range ($, $$, $$$, $$$$) from the page"""
-        # Look for price indicators
-        price_indicators = ['$', '$$', '$$$', '$$$$']
-        
-        page_text = soup.get_text()
-        
-        # Look for price range patterns
-        price_patterns = [
-            r'Price[:\s]*(\$+)',
-            r'Cost[:\s]*(\$+)',
-            r'(\$+)\s*price',
-            r'(\$+)\s*range',
-        ]
-        
-        for pattern in price_patterns:
-            matches = re.findall(pattern, page_text, re.IGNORECASE)
-            if matches:
-                return matches[0]
-        
-        # Look for individual $ signs in context
-        for indicator in price_indicators:
-            if indicator in page_text:
-                return indicator
+    def extract_view(self, view: PageView) -> Dict:
+        """Run every characteristics field against a parsed page"""
         
-        return None
+        values = CHARACTERISTICS.extract(view)
+        return {name: value for name, value in values.items() if value}
     
-    def extract_facebook_url(self, soup: BeautifulSoup) -> Optional[str]:
-        """Extract Facebook URL from the page"""
-        # Look for Facebook links
-        facebook_patterns = [
-            r'https?://(?:www\.)?facebook\.com/[^\s"<>]+',
-            r'https?://(?:www\.)?fb\.com/[^\s"<>]+',
-        ]
-        
-        # Search in href attributes
-        for link in soup.find_all('a', href=True):
-            href = link['href']
-            if 'facebook.com' in href or 'fb.com' in href:
-                return href
-        
-        # Search in page text
-        page_text = soup.get_text()
-        for pattern in facebook_patterns:
-            matches = re.findall(pattern, page_text)
-            if matches:
-                return matches[0]
-        
-        return None
-    
-    def extract_instagram_url(self, soup: BeautifulSoup) -> Optional[str]:
-        """Extract Instagram URL from the page"""
-        # Look for Instagram links
-        instagram_patterns = [
-            r'https?://(?:www\.)?instagram\.com/[^\s"<>]+',
-            r'https?://(?:www\.)?ig\.com/[^\s"<>]+',
-        ]
-        
-        # Search in href attributes
-        for link in soup.find_all('a', href=True):
-            href = link['href']
-            if 'instagram.com' in href or 'ig.com' in href:
-                return href
-        
-        # Search in page text
-        page_text = soup.get_text()
-        for pattern in instagram_patterns:
-            matches = re.findall(pattern, page_text)
-            if matches:
-                return matches[0]
-        
-        return None
-    
-    def extract_menu_url(self, soup: BeautifulSoup) -> Optional[str]:
-        """Extract S3 menu URL from the page"""
-        # Look for S3 menu URLs
-        s3_patterns = [
-            r'https?://[^"\s<>]*s3\.amazonaws\.com[^"\s<>]*',
-            r'https?://[^"\s<>]*nyc-tourism-public\.s3\.amazonaws\.com[^"\s<>]*',
-        ]
-        
-        # Search in href attributes for "See Menu" or similar buttons
-        for link in soup.find_all('a', href=True):
-            href = link['href']
-            link_text = link.get_text().lower().strip()
-            
-            # Check if it's a menu-related link
-            if any(keyword in link_text for keyword in ['menu', 'see menu', 'view menu', 'download menu']):
-                if 's3.amazonaws.com' in href:
-                    return href
-        
-        # Search in all href attributes for S3 URLs
-        for link in soup.find_all('a', href=True):
-            href = link['href']
-            if 's3.amazonaws.com' in href:
-                return href
-        
-        # Search in page text for S3 URLs
-        page_text = soup.get_text()
-        for pattern in s3_patterns:
-            matches = re.findall(pattern, page_text)
-            if matches:
-                return matches[0]
-        
-        return None
-    
-    def process_restaurant(self, restaurant_data: Tuple[int, int, Dict]) -> Dict:
-        """Extract characteristics for a single restaurant"""
-        
-        index, total, restaurant = restaurant_data
-        
-        print(f"[{index}/{total}] {restaurant['name']}")
-        
-        # Extract characteristics
-        result = self.extract_restaurant_characteristics(restaurant)
-        
-        # Reduced delay between restaurants
-        time.sleep(0.1)
-        
-        return result
-    
-    def process_all_restaurants(self, restaurants: List[Dict]) -> List[Dict]:
-        """Process all restaurants using parallel processing"""
+    def process_all_restaurants(self, restaurants: List[Dict], page_results: Dict[str, Dict],
+                                pipeline: RestaurantPagePipeline) -> List[Dict]:
+        """Apply the characteristics extracted by the shared page fetch, fetching only missing pages"""
         
         print(f"🏢 Starting characteristics extraction for {len(restaurants)} restaurants...")
-        print(f"⏱️  Estimated time: ~{len(restaurants) * 0.3 / 60:.1f} minutes")
-        
-        processed_restaurants = []
         
-        # Prepare data with progress info
-        restaurant_data = [(i+1, len(restaurants), restaurant) 
-                          for i, restaurant in enumerate(restaurants)]
+        # Pages the geocoder stage could not fetch (or a stale extractions file) are fetched here
+        missing = [restaurant for restaurant in restaurants
+                   if 'characteristics' not in page_results.get(restaurant.get('slug'), {})]
+        print(f"♻️  {len(restaurants) - len(missing)} restaurants already extracted by the page pipeline")
         
-        # Use more workers for faster processing
-        with ThreadPoolExecutor(max_workers=8) as executor:
-            future_to_restaurant = {
-                executor.submit(self.process_restaurant, data): data[2]['name']
-                for data in restaurant_data
-            }
-            
-            for future in as_completed(future_to_restaurant):
-                restaurant_name = future_to_restaurant[future]
-                try:
-                    result = future.result()
-                    processed_restaurants.append(result)
-                    
-                    # Progress update
-                    if len(processed_restaurants) % 25 == 0:
-                        success_count = sum(1 for r in processed_restaurants if any(r.get(char) for char in ['telephone', 'price_range', 'facebook_url', 'instagram_url', 'menu_url']))
-                        print(f"\n📊 Progress: {len(processed_restaurants)}/{len(restaurants)} ({success_count} with characteristics found)")
-                        
-                except Exception as e:
-                    print(f"❌ Error processing {restaurant_name}: {e}")
+        if missing:
+            print(f"⏱️  Estimated time for {len(missing)} missing pages: ~{len(missing) / pipeline.rate_limiter.rate / 60:.1f} minutes")
+            page_results = {**page_results, **pipeline.run(missing)}
         
-        # Sort results to maintain original order
-        processed_restaurants.sort(key=lambda x: next(i for i, r in enumerate(restaurants) if r['name'] == x['name']))
+        processed_restaurants = []
+        for restaurant in restaurants:
+            restaurant_copy = restaurant.copy()
+            restaurant_copy.update(page_results.get(restaurant.get('slug'), {}).get('characteristics', {}))
+            processed_restaurants.append(restaurant_copy)
         
-        print(f"\n🎉 Processing complete!")
+        success_count = sum(1 for r in processed_restaurants if any(r.get(char) for char in ['telephone', 'price_range', 'facebook_url', 'instagram_url', 'menu_url']))
+        print(f"\n🎉 Processing complete! ({success_count} with characteristics found)")
         
         return processed_restaurants
     
@@ -294,9 +113,34 @@ class RestaurantCharacteristicsExtractor:
         except Exception as e:
             print(f"Error saving data: {e}")
 
+def extract_characteristics_from_html(page_content: str) -> Dict:
+    """Page pipeline extractor: telephone, price range, social and menu links"""
+    return RestaurantCharacteristicsExtractor().parse_page(page_content)
+
 def main():
     """Main function"""
     
+    parser = argparse.ArgumentParser(description="Apply characteristics extracted by the page pipeline, "
+                                                 "fetching only pages it is missing")
+    parser.add_argument('--resume', action='store_true',
+                        help="Reuse restaurants journaled by an interrupted run and only fetch missing or failed ones")
+    parser.add_argument('--reextract', action='store_true',
+                        help="Ignore 2_PageExtractions.json and re-run the extractors over every page "
+                             "(served from the page cache when fresh)")
+    parser.add_argument('--html-backend', choices=PREFERRED_BACKENDS, default=DEFAULT_BACKEND,
+                        help=f"HTML parser for restaurant pages (default: {DEFAULT_BACKEND}; the faster ones "
+                             "are opt-in once benchmark_html_backends.py shows identical results)")
+    parser.add_argument('--parse-workers', type=int, default=None,
+                        help="Processes parsing fetched pages (default: one per CPU; 0 parses in the fetch threads)")
+    add_cache_arguments(parser)
+    args = parser.parse_args()
+    
+    try:
+        set_default_backend(args.html_backend)
+    except ValueError as e:
+        parser.error(str(e))
+    print(f"🧩 HTML backend: {default_backend()}")
+    
     # Load the cleaned restaurant data
     try:
         # Try different possible paths
@@ -323,14 +167,20 @@ def main():
         print(f"❌ Error loading data: {e}")
         return
     
-    # Initialize processor
+    # Initialize processor; pages come from the geocoder stage's single fetch
     processor = RestaurantCharacteristicsExtractor()
+    page_results = {} if args.reextract else load_page_extractions()
+    pipeline = RestaurantPagePipeline(['characteristics'], max_workers=8, cache=cache_from_args(args),
+                                      parse_workers=args.parse_workers)
+    journal = open_journal('characteristics', args.resume)
+    pipeline.use_journal(journal, args.resume)
     
     # Process all restaurants
-    processed_restaurants = processor.process_all_restaurants(restaurants)
+    processed_restaurants = processor.process_all_restaurants(restaurants, page_results, pipeline)
     
     # Save results
     processor.save_data(processed_restaurants)
+    close_journal(journal)
     
     # Print summary
     print(f"\n📊 Final Summary:")
@@ -1,7 +1,28 @@
+import re
 import json
+import math
+import argparse
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from urllib.parse import urlparse
 import pandas as pd
-from typing import Dict, List, Tuple
-from collections import Counter
+from typing import Dict, List, NamedTuple, Optional, Sequence, Set, Tuple, Union
+from collections import Counter, defaultdict
+
+from aho_corasick import ContainmentMatcher
+from name_normalization import NAME_CHAR_TABLE, WORD_REPLACEMENTS, normalize_name, normalize_names
+from ngram_join import NGRAM_SIZE, NgramMatcher, NgramSettings
+from geo_index import GridIndex, item_coordinates
+from match_cache import DEFAULT_MATCH_CACHE, MatchDecision, MatchDecisionCache, SourceDecisions, fingerprint
+
+# Words found in more than this share of a reference list never generate candidates on their own
+COMMON_WORD_SHARE = 0.1
+
+# Strategy 3 accepts a candidate whose shared words carry this share of the lighter name's weight
+WORD_OVERLAP_THRESHOLD = 0.7
+
+# MatchIndex name strategies, tried in this order; a subset runs only those (used to score each one)
+NAME_STRATEGIES = ('exact', 'containment', 'words')
 
 def load_json_file(filepath: str) -> List[Dict]:
     """Load JSON file and return list of dictionaries"""
@@ -29,69 +50,335 @@ def load_json_file(filepath: str) -> List[Dict]:
 
 def normalize_string(s: str) -> str:
     """Normalize string for better matching with robust handling of variations"""
-    if not s:
-        return ""
+    return normalize_name(s)
+
+class MatchIndex:
+    """A reference list (Michelin, NYT) prepared once for find_best_match
+    
+    Normalized names, an exact-match map, containment automatons and token postings
+    are computed when the index is built, so a lookup normalizes only the restaurant
+    name, containment in either direction takes one pass over it, and the
+    common-words strategy only looks at references that share at least two words
+    with it. Words are weighted by inverse document
+    frequency, so ones that appear across the list ("the", "bar", "rest") count for
+    little, and the best scoring candidate is returned rather than the first.
+    """
+    
+    def __init__(self, reference_data: List[Dict], strategies: Sequence[str] = NAME_STRATEGIES):
+        self.items = reference_data
+        self.strategies = tuple(strategies)
+        self.names = [item.get('name', '') for item in reference_data]
+        self.normalized = normalize_names(self.names)
+        
+        # Strategy 1: the references with each normalized name, in list order
+        self.exact = defaultdict(list)
+        for i, ref_normalized in enumerate(self.normalized):
+            self.exact[ref_normalized].append(i)
+        
+        # Strategy 2 only considers names longer than 5 characters
+        self.long_names = ContainmentMatcher((i, ref_normalized) for i, ref_normalized in enumerate(self.normalized)
+                                             if len(ref_normalized) > 5)
+        
+        # The manual review report compares the raw names case-insensitively
+        self.lowered_names = ContainmentMatcher((i, name.lower()) for i, name in enumerate(self.names))
+        
+        # Strategy 3: word sets and, per word, the references containing it (in list order)
+        self.word_sets = [set(ref_normalized.split()) for ref_normalized in self.normalized]
+        self.postings = defaultdict(list)
+        for i, ref_words in enumerate(self.word_sets):
+            for word in ref_words:
+                self.postings[word].append(i)
+        
+        self.common_cutoff = max(1, len(reference_data) * COMMON_WORD_SHARE)
+        self.word_weights = [self.words_weight(ref_words) for ref_words in self.word_sets]
+        
+        # Character n-gram vectors, built on the first batch fuzzy lookup
+        self.ngrams = None
     
-    import unicodedata
-    import re
-    
-    # Convert to lowercase and strip whitespace
-    normalized = s.lower().strip()
-    
-    # Remove accents and diacritics
-    normalized = unicodedata.normalize('NFD', normalized)
-    normalized = ''.join(c for c in normalized if not unicodedata.combining(c))
-    
-    # Replace common variations
-    replacements = {
-        "'": "",           # Remove apostrophes
-        '"': "",           # Remove quotes
-        "'": "",           # Remove smart quotes
-        '"': "",           # Remove smart quotes
-        "&": "and",        # Replace & with and
-        "-": " ",          # Replace hyphens with spaces
-        "_": " ",          # Replace underscores with spaces
-        ".": "",           # Remove periods
-        ",": "",           # Remove commas
-        "!": "",           # Remove exclamation marks
-        "?": "",           # Remove question marks
-        "(": "",           # Remove parentheses
-        ")": "",
-        "[": "",
-        "]": "",
-        "{": "",
-        "}": "",
-        "st.": "street",   # Common abbreviations
-        "ave.": "avenue",
-        "rd.": "road",
-        "blvd.": "boulevard",
-        "dr.": "drive",
-        "ln.": "lane",
-        "pl.": "place",
-        "ct.": "court",
-        "sq.": "square",
-        "n.": "north",
-        "s.": "south",
-        "e.": "east",
-        "w.": "west",
-        "co.": "company",
-        "inc.": "",
-        "llc": "",
-        "ltd": "",
-        "restaurant": "rest",
-        "restaurants": "rest",
-        "cafe": "café",
-        "café": "cafe",
-    }
+    def idf(self, word: str) -> float:
+        """Smoothed inverse document frequency; words not in the list weigh the most"""
+        return math.log((len(self.items) + 1) / (len(self.postings.get(word, ())) + 1)) + 1
+    
+    def words_weight(self, words) -> float:
+        return sum(self.idf(word) for word in words)
+    
+    def __len__(self):
+        return len(self.items)
     
-    # Apply replacements
-    for old, new in replacements.items():
-        normalized = normalized.replace(old, new)
+    def find(self, restaurant_name: str, allowed: Optional[Set[int]] = None) -> Optional[Dict]:
+        """Find the best match for a restaurant name using various strategies
+        
+        allowed limits the match to those reference positions (such as the ones nearby).
+        """
+        i = self.find_position(restaurant_name, allowed)
+        return self.items[i] if i is not None else None
+    
+    def find_position(self, restaurant_name: str, allowed: Optional[Set[int]] = None) -> Optional[int]:
+        """Position in the reference list of the best match, or None"""
+        normalized_name = normalize_string(restaurant_name)
+        
+        # Strategy 1: Exact normalized match
+        if 'exact' in self.strategies:
+            exact = [i for i in self.exact.get(normalized_name, ()) if allowed is None or i in allowed]
+            if exact:
+                return exact[0]
+        
+        # Strategy 2: Check if one name contains the other (for cases like "The Dining Room at Gramercy Tavern" vs "Gramercy Tavern")
+        if 'containment' in self.strategies and len(normalized_name) > 5:
+            contained = [i for i in self.long_names.related(normalized_name) if allowed is None or i in allowed]
+            if contained:
+                return contained[0]
+        
+        # Strategy 3: Check for common words/phrases, weighted by how rare they are
+        if 'words' not in self.strategies:
+            return None
+        
+        restaurant_words = set(normalized_name.split())
+        restaurant_weight = self.words_weight(restaurant_words)
+        
+        # Only references sharing a rare word are candidates
+        candidates = set()
+        for word in restaurant_words:
+            postings = self.postings.get(word, ())
+            if len(postings) <= self.common_cutoff:
+                candidates.update(postings)
+        if allowed is not None:
+            candidates &= allowed
+        
+        best_match, best_score = None, 0.0
+        for i in sorted(candidates):
+            common_words = restaurant_words & self.word_sets[i]
+            if len(common_words) < 2:
+                continue
+            
+            shared_weight = self.words_weight(common_words)
+            if shared_weight < min(restaurant_weight, self.word_weights[i]) * WORD_OVERLAP_THRESHOLD:
+                continue
+            
+            # Weighted Dice coefficient; ties go to the earlier reference
+            score = 2 * shared_weight / (restaurant_weight + self.word_weights[i])
+            if score > best_score:
+                best_match, best_score = i, score
+        
+        return best_match
+    
+    def ngram_matcher(self) -> NgramMatcher:
+        """Character n-gram vectors of the list, built on first use"""
+        if self.ngrams is None:
+            self.ngrams = NgramMatcher(self.normalized)
+        return self.ngrams
+    
+    def top_matches(self, restaurant_names: List[str], settings: NgramSettings) -> List[List[Tuple[int, float]]]:
+        """Batch fuzzy lookup: the top-k (reference index, score) pairs for every name at once"""
+        return self.ngram_matcher().top_matches(normalize_names(restaurant_names), settings)
+    
+    def candidate_list(self, candidates: List[Tuple[int, float]]) -> List[Dict]:
+        """Scored candidates as written to the output for auditing"""
+        return [{'name': self.names[i], 'score': score} for i, score in candidates]
+    
+    def find_containing(self, original_name: str) -> List[int]:
+        """References whose name contains, or is contained in, the raw name (case-insensitive)"""
+        return self.lowered_names.related(original_name.lower())
+
+def website_domain(url: str) -> str:
+    """Host of a website URL without 'www.', so http/https and page paths compare equal"""
+    if not url:
+        return ""
+    host = urlparse(url if '//' in url else f"//{url}").netloc.lower()
+    return host[4:] if host.startswith('www.') else host
+
+def telephone_digits(phone: str) -> str:
+    """Last ten digits of a phone number, dropping formatting and the +1 country code"""
+    digits = re.sub(r'\D', '', phone or '')
+    return digits[-10:] if len(digits) >= 10 else ""
+
+# Exact join keys and how to normalize each; a key is only used when both lists have it
+EXACT_KEY_NORMALIZERS = {
+    'website': website_domain,
+    'telephone': telephone_digits,
+    'slug': lambda slug: (slug or '').strip().lower(),
+}
+
+# Neither the Michelin nor the NYT list carries a website or phone number, so only the
+# slug is on by default; the other keys are there for reference lists that have them
+DEFAULT_EXACT_KEYS = ['slug']
+
+class ExactKeyIndex:
+    """Hash maps from strong identifiers to reference positions, for the first pass of a join"""
+    
+    def __init__(self, reference_data: List[Dict], keys: List[str]):
+        self.maps = {}
+        for key in keys:
+            normalize = EXACT_KEY_NORMALIZERS[key]
+            positions = defaultdict(list)
+            for i, item in enumerate(reference_data):
+                value = normalize(item.get(key))
+                if value:
+                    positions[value].append(i)
+            
+            # A value several references share (a restaurant group's website) identifies none of them
+            if positions:
+                self.maps[key] = {value: found[0] for value, found in positions.items() if len(found) == 1}
+    
+    def values(self, item: Dict) -> Dict[str, str]:
+        """The item's normalized value for each key in use"""
+        return {key: EXACT_KEY_NORMALIZERS[key](item.get(key)) for key in self.maps}
+    
+    def find(self, item: Dict, allowed: Optional[Set[int]] = None) -> Tuple[Optional[int], str]:
+        """Reference position matched on the first key that agrees, and that key"""
+        for key, values in self.maps.items():
+            value = EXACT_KEY_NORMALIZERS[key](item.get(key))
+            i = values.get(value) if value else None
+            if i is not None and (allowed is None or i in allowed):
+                return i, key
+        return None, ''
+
+# Bump when a matching strategy changes in a way the settings below do not capture,
+# so cached match decisions are made again
+MATCH_RULES_VERSION = 1
+
+def match_context(reference_data: List[Dict], **settings) -> str:
+    """Fingerprint of a reference list, the join settings and the matching rules;
+    cached match decisions only hold for the same context"""
+    rules = {
+        'version': MATCH_RULES_VERSION,
+        'normalization': [sorted(NAME_CHAR_TABLE.items()), WORD_REPLACEMENTS],
+        'common_word_share': COMMON_WORD_SHARE,
+        'word_overlap_threshold': WORD_OVERLAP_THRESHOLD,
+        'ngram_size': NGRAM_SIZE,
+    }
+    return fingerprint({'rules': rules, 'settings': settings, 'reference_data': reference_data})
+
+def match_cascade(items: List[Dict], name_key: str, match_index: MatchIndex, key_index: ExactKeyIndex,
+                  ngram: Optional[NgramSettings] = None,
+                  allowed_sets: Optional[List[Optional[Set[int]]]] = None,
+                  decisions: Optional[SourceDecisions] = None,
+                  workers: int = 0) -> Tuple[List[Tuple[Optional[int], str]], List[Optional[List]]]:
+    """Match every item to a reference position, recording the stage that matched it
+    
+    Exact keys are hash lookups and settle most rows; only the rest go to the name
+    matchers (the strategies, or one n-gram batch). Returns (position, stage) per item,
+    stage being 'exact_<key>', 'fuzzy_<name_key>', 'ngram_<name_key>' or '' when
+    unmatched, plus the scored n-gram candidates of the rows that went through them.
+    
+    With stored decisions, rows whose inputs were matched before in the same context
+    reuse that decision and only the others are matched. With workers, the rows to
+    match are sharded across that many processes.
+    """
+    allowed_sets = allowed_sets or [None] * len(items)
+    if decisions is None:
+        return sharded_cascade(items, name_key, match_index, key_index, ngram, allowed_sets, workers)
+    
+    # Everything the matchers read from a row
+    row_keys = [json.dumps([normalize_name(item.get(name_key, '')), key_index.values(item),
+                            sorted(allowed) if allowed is not None else None], ensure_ascii=False)
+                for item, allowed in zip(items, allowed_sets)]
+    stored = decisions.lookup(row_keys)
+    pending = [position for position, row_key in enumerate(row_keys) if row_key not in stored]
+    
+    matched, scored = sharded_cascade([items[position] for position in pending], name_key, match_index, key_index,
+                                      ngram, [allowed_sets[position] for position in pending], workers)
+    
+    new_decisions = {}
+    for position, (i, stage), candidates in zip(pending, matched, scored):
+        score = candidates[0][1] if candidates else None
+        reference = (match_index.items[i].get('slug') or match_index.names[i]) if i is not None else None
+        new_decisions[row_keys[position]] = (MatchDecision(i, stage, score, candidates), reference)
+    decisions.store(new_decisions)
+    print(f"🗃️  {decisions.name}: reused {len(items) - len(pending)} stored match decisions, matched {len(pending)} rows")
+    
+    all_decisions = {**stored, **{row_key: decision for row_key, (decision, _) in new_decisions.items()}}
+    matches = [(all_decisions[row_key].position, all_decisions[row_key].stage) for row_key in row_keys]
+    candidate_lists = [all_decisions[row_key].candidates for row_key in row_keys]
+    return matches, candidate_lists
+
+# Rows per shard below which a shard is not worth a task
+MIN_SHARD_ROWS = 256
+
+# Shards per worker, so a slow shard does not leave the other workers idle
+SHARDS_PER_WORKER = 4
+
+# Indexes of the source being joined, installed in each worker process by its initializer
+_shard_state = None
+
+def init_join_worker(state: Tuple):
+    global _shard_state
+    _shard_state = state
+
+def match_shard_in_worker(items: List[Dict], allowed_sets: List[Optional[Set[int]]]) -> Tuple[List, List]:
+    """Worker process entry point: run the cascade on one shard of rows"""
+    name_key, match_index, key_index, ngram = _shard_state
+    return run_cascade(items, name_key, match_index, key_index, ngram, allowed_sets)
+
+def sharded_cascade(items: List[Dict], name_key: str, match_index: MatchIndex, key_index: ExactKeyIndex,
+                    ngram: Optional[NgramSettings], allowed_sets: List[Optional[Set[int]]],
+                    workers: int = 0) -> Tuple[List[Tuple[Optional[int], str]], List[Optional[List]]]:
+    """run_cascade over contiguous shards of the rows on a process pool, merged back in order
+    
+    The indexes are built before the pool starts and handed to each worker once by
+    its initializer: under fork (used where available) workers inherit them without
+    any copying, elsewhere they are pickled once per worker rather than per task.
+    Only the shard rows travel with each task.
+    """
+    shard_size = max(MIN_SHARD_ROWS, -(-len(items) // max(workers * SHARDS_PER_WORKER, 1)))
+    if workers <= 1 or len(items) <= shard_size:
+        return run_cascade(items, name_key, match_index, key_index, ngram, allowed_sets)
+    
+    if ngram:
+        # Build the n-gram vectors now so the workers share them
+        match_index.ngram_matcher()
+    
+    starts = range(0, len(items), shard_size)
+    mp_context = multiprocessing.get_context('fork') if 'fork' in multiprocessing.get_all_start_methods() else None
+    with ProcessPoolExecutor(max_workers=workers, mp_context=mp_context, initializer=init_join_worker,
+                             initargs=((name_key, match_index, key_index, ngram),)) as pool:
+        shards = pool.map(match_shard_in_worker,
+                          [items[start:start + shard_size] for start in starts],
+                          [allowed_sets[start:start + shard_size] for start in starts])
+        
+        matches, candidate_lists = [], []
+        for shard_matches, shard_candidates in shards:
+            matches.extend(shard_matches)
+            candidate_lists.extend(shard_candidates)
     
-    # Remove extra whitespace and normalize spaces
-    normalized = re.sub(r'\s+', ' ', normalized).strip()
+    return matches, candidate_lists
+
+def run_cascade(items: List[Dict], name_key: str, match_index: MatchIndex, key_index: ExactKeyIndex,
+                ngram: Optional[NgramSettings],
+                allowed_sets: List[Optional[Set[int]]]) -> Tuple[List[Tuple[Optional[int], str]], List[Optional[List]]]:
+    """The matching behind match_cascade, for rows without a stored decision"""
+    
+    matches = []
+    for item, allowed in zip(items, allowed_sets):
+        i, key = key_index.find(item, allowed)
+        matches.append((i, f"exact_{key}" if i is not None else ''))
+    pending = [position for position, (i, _) in enumerate(matches) if i is None]
+    
+    candidate_lists = [None] * len(items)
+    if ngram:
+        # Blocking filters the scored candidates, so then score against every reference
+        blocked = any(allowed_sets[position] is not None for position in pending)
+        batch_settings = ngram._replace(top_k=len(match_index)) if blocked else ngram
+        scored = match_index.top_matches([items[position].get(name_key, '') for position in pending], batch_settings)
+        
+        for position, candidates in zip(pending, scored):
+            allowed = allowed_sets[position]
+            candidates = [candidate for candidate in candidates if allowed is None or candidate[0] in allowed][:ngram.top_k]
+            candidate_lists[position] = candidates
+            if candidates:
+                matches[position] = (candidates[0][0], f"ngram_{name_key}")
+    else:
+        for position in pending:
+            i = match_index.find_position(items[position].get(name_key, ''), allowed_sets[position])
+            if i is not None:
+                matches[position] = (i, f"fuzzy_{name_key}")
     
-    return normalized
+    return matches, candidate_lists
+
+def print_stage_counts(label: str, matches: List[Tuple[Optional[int], str]]):
+    stages = Counter(stage for _, stage in matches if stage)
+    if stages:
+        print(f"🔑 {label} matches by stage: " + ", ".join(f"{stage} {count}" for stage, count in stages.most_common()))
 
 def find_best_join_key(characteristics_data: List[Dict], michelin_data: List[Dict]) -> Tuple[str, int, int]:
     """Test both 'name' and 'slug' fields to see which performs better"""
@@ -128,155 +415,244 @@ def find_best_join_key(characteristics_data: List[Dict], michelin_data: List[Dic
     
     return best_key, best_match_count, len(characteristics_data)
 
-def join_michelin_data(characteristics_data: List[Dict], michelin_data: List[Dict], join_key: str) -> List[Dict]:
-    """Join the two datasets using the specified key"""
+class ReferenceSource(NamedTuple):
+    """A reference list joined onto the restaurants
+    
+    A matched restaurant gets `<prefix>_<suffix>` for each projected field (suffix ->
+    field of the reference entry), left empty when nothing matched, followed by
+    `<prefix>_match_stage`; in ngram mode `<prefix>_match_score` and
+    `<prefix>_candidates` come first.
+    """
+    name: str                       # Key of the stored match decisions
+    label: str                      # Used in messages
+    records: List[Dict]
+    prefix: str
+    fields: Dict[str, str]
+    name_key: str = 'name'          # Restaurant field compared with the reference names
+    exact_keys: Sequence[str] = DEFAULT_EXACT_KEYS
+    name_strategies: Sequence[str] = NAME_STRATEGIES  # MatchIndex strategies outside ngram mode
+    geo_radius: float = 0.0         # Meters; 0 compares every restaurant with the whole list
+    detail: Tuple[str, str] = ('', '')  # (label, reference field) shown for each match
+    snapshot_file: Optional[str] = None  # Restaurants joined up to this source
+
+    def output_fields(self, ngram: Optional[NgramSettings] = None) -> List[str]:
+        scored = [f"{self.prefix}_match_score", f"{self.prefix}_candidates"] if ngram else []
+        return scored + [f"{self.prefix}_{suffix}" for suffix in self.fields] + [f"{self.prefix}_match_stage"]
+
+def source_geo_index(source: ReferenceSource) -> Tuple[Optional[GridIndex], Set[int]]:
+    """Grid of the source entries that have coordinates, and the positions of those that do not"""
     
-    print(f"\n🔗 Joining Michelin data using '{join_key}' field...")
+    located = [(i, *item_coordinates(item)) for i, item in enumerate(source.records) if item_coordinates(item)]
+    unlocated = {i for i in range(len(source.records)) if not item_coordinates(source.records[i])}
     
-    # Join the data
-    joined_data = []
-    matched_count = 0
-    potential_matches = []
+    if not source.geo_radius or not located:
+        if source.geo_radius:
+            print(f"⚠️ {source.label} list has no coordinates; matching by name alone")
+        return None, unlocated
     
-    for char_item in characteristics_data:
-        # Create a copy of the characteristics item
-        joined_item = char_item.copy()
+    print(f"📍 Only matching {source.label} restaurants within {source.geo_radius:.0f}m "
+          f"({len(located)}/{len(source.records)} {source.label} entries have coordinates)")
+    return GridIndex(located, source.geo_radius), unlocated
+
+class SourceJoin:
+    """One source's indexes, built once, and its match for every restaurant
+    
+    Restaurants are first matched on the exact keys (the slug by default; website
+    domain and phone number for lists that carry them), and only the rest by name. With ngram settings every remaining name is
+    scored against the list in one batch of character n-gram similarities instead of
+    going through the matching strategies. With a geo radius, a geocoded restaurant is
+    only compared with the entries that close to it (plus any entry without
+    coordinates), so branches and namesakes elsewhere in the city cannot match. With a
+    match cache, decisions from earlier runs are reused for unchanged restaurants.
+    """
+    
+    def __init__(self, source: ReferenceSource, ngram: Optional[NgramSettings] = None,
+                 match_cache: Optional[MatchDecisionCache] = None, workers: int = 0):
+        self.source = source
+        self.ngram = ngram
+        self.workers = workers
         
-        # Try to find matching Michelin data using enhanced matching
-        michelin_match = find_best_michelin_match(char_item.get(join_key, ''), michelin_data)
+        print(f"\n🔗 Joining {source.label} data using '{source.name_key}' field...")
         
-        if michelin_match:
-            # Add Michelin fields with 'michelin_' prefix to avoid conflicts
-            joined_item['michelin_award'] = michelin_match.get('michelin_award', '')
-            joined_item['michelin_slug'] = michelin_match.get('slug', '')
-            matched_count += 1
-            print(f"✅ Matched: '{char_item.get(join_key, '')}' ↔ '{michelin_match.get('name', '')}' (Award: {michelin_match.get('michelin_award', '')})")
-        else:
-            # Add empty Michelin fields for unmatched restaurants
-            joined_item['michelin_award'] = ''
-            joined_item['michelin_slug'] = ''
-            
-            # Check for potential matches (fuzzy matching)
-            original_name = char_item.get(join_key, '')
-            for michelin_item in michelin_data:
-                michelin_name = michelin_item.get('name', '')
-                if original_name.lower() in michelin_name.lower() or michelin_name.lower() in original_name.lower():
-                    potential_matches.append({
-                        'restaurant_name': original_name,
-                        'michelin_name': michelin_name,
-                        'michelin_award': michelin_item.get('michelin_award', '')
-                    })
+        # Normalize the list once for every lookup
+        self.match_index = MatchIndex(source.records, source.name_strategies)
+        self.key_index = ExactKeyIndex(source.records, list(source.exact_keys))
+        self.geo_index, self.unlocated = source_geo_index(source)
         
-        joined_data.append(joined_item)
-    
-    print(f"✅ Joined {len(joined_data)} restaurants")
-    print(f"✅ Matched {matched_count} restaurants with Michelin data")
-    print(f"✅ {len(joined_data) - matched_count} restaurants without Michelin data")
-    
-    # Show potential matches that might need manual review
-    if potential_matches:
-        print(f"\n🔍 Potential Michelin matches that might need manual review:")
-        for i, match in enumerate(potential_matches[:10]):  # Show first 10
-            print(f"   {i+1}. '{match['restaurant_name']}' ↔ '{match['michelin_name']}' (Award: {match['michelin_award']})")
-        if len(potential_matches) > 10:
-            print(f"   ... and {len(potential_matches) - 10} more potential matches")
+        self.decisions = None
+        if match_cache:
+            self.decisions = match_cache.source(source.name, match_context(
+                source.records, name_key=source.name_key, ngram=ngram,
+                geo_radius=source.geo_radius, exact_keys=list(source.exact_keys),
+                name_strategies=list(source.name_strategies)))
+        
+        self.matches = []
+        self.candidate_lists = []
+        self.compared = []
     
-    return joined_data
-
-def find_best_match(restaurant_name: str, reference_data: List[Dict], data_type: str = "reference") -> Dict:
-    """Find the best match for a restaurant name using various strategies"""
-    normalized_name = normalize_string(restaurant_name)
+    def match(self, restaurants: List[Dict]):
+        """Match every restaurant against the list"""
+        
+        # Entries near each restaurant; None compares it with the whole list
+        allowed_sets = []
+        for restaurant in restaurants:
+            coordinates = item_coordinates(restaurant)
+            allowed_sets.append(set(self.geo_index.within(*coordinates)) | self.unlocated
+                                if self.geo_index and coordinates else None)
+        self.compared = [len(allowed) for allowed in allowed_sets if allowed is not None]
+        
+        self.matches, self.candidate_lists = match_cascade(restaurants, self.source.name_key, self.match_index,
+                                                           self.key_index, self.ngram, allowed_sets, self.decisions,
+                                                           self.workers)
     
-    # Strategy 1: Exact normalized match
-    for ref_item in reference_data:
-        ref_normalized = normalize_string(ref_item.get('name', ''))
-        if normalized_name == ref_normalized:
-            return ref_item
+    def annotate(self, row: Dict, position: int):
+        """Add this source's fields for the restaurant at a position to its output row"""
+        
+        source = self.source
+        i, stage = self.matches[position]
+        
+        if self.ngram:
+            # Scores kept for auditing (rows settled by an exact key were not scored)
+            candidates = self.candidate_lists[position]
+            row[f"{source.prefix}_match_score"] = candidates[0][1] if candidates else None
+            row[f"{source.prefix}_candidates"] = self.match_index.candidate_list(candidates or [])
+        
+        reference = source.records[i] if i is not None else {}
+        for suffix, field in source.fields.items():
+            row[f"{source.prefix}_{suffix}"] = reference.get(field, '')
+        row[f"{source.prefix}_match_stage"] = stage
     
-    # Strategy 2: Check if one name contains the other (for cases like "The Dining Room at Gramercy Tavern" vs "Gramercy Tavern")
-    for ref_item in reference_data:
-        ref_name = ref_item.get('name', '')
-        ref_normalized = normalize_string(ref_name)
+    def report(self, restaurants: List[Dict]):
+        """Print the matches, the counts and the unmatched names that might need manual review"""
+        
+        source = self.source
+        detail_label, detail_field = source.detail
+        matched_count = 0
+        potential_matches = []
         
-        # Check if one contains the other (but not too short to avoid false positives)
-        if (len(normalized_name) > 5 and len(ref_normalized) > 5 and 
-            (normalized_name in ref_normalized or ref_normalized in normalized_name)):
-            return ref_item
-    
-    # Strategy 3: Check for common words/phrases
-    restaurant_words = set(normalized_name.split())
-    for ref_item in reference_data:
-        ref_name = ref_item.get('name', '')
-        ref_normalized = normalize_string(ref_name)
-        ref_words = set(ref_normalized.split())
+        for restaurant, (i, _) in zip(restaurants, self.matches):
+            original_name = restaurant.get(source.name_key, '')
+            if i is not None:
+                matched_count += 1
+                detail = f" ({detail_label}: {source.records[i].get(detail_field, '')})" if detail_label else ""
+                print(f"✅ Matched: '{original_name}' ↔ '{self.match_index.names[i]}'{detail}")
+            else:
+                # Check for potential matches (fuzzy matching)
+                for candidate in self.match_index.find_containing(original_name):
+                    potential_matches.append((original_name, candidate))
         
-        # If they share significant words, it might be a match
-        common_words = restaurant_words & ref_words
-        if len(common_words) >= 2 and len(common_words) >= min(len(restaurant_words), len(ref_words)) * 0.7:
-            return ref_item
+        print(f"✅ Joined {len(restaurants)} restaurants")
+        print(f"✅ Matched {matched_count} restaurants with {source.label} data")
+        print(f"✅ {len(restaurants) - matched_count} restaurants without {source.label} data")
+        print_stage_counts(source.label, self.matches)
+        if self.geo_index:
+            print(f"📍 {len(self.compared)} geocoded restaurants compared with {sum(self.compared) / max(len(self.compared), 1):.1f} "
+                  f"{source.label} entries on average; {len(restaurants) - len(self.compared)} without coordinates used the whole list")
+        
+        # Show potential matches that might need manual review
+        if potential_matches:
+            print(f"\n🔍 Potential {source.label} matches that might need manual review:")
+            for n, (original_name, candidate) in enumerate(potential_matches[:10]):  # Show first 10
+                detail = f" ({detail_label}: {source.records[candidate].get(detail_field, '')})" if detail_label else ""
+                print(f"   {n+1}. '{original_name}' ↔ '{self.match_index.names[candidate]}'{detail}")
+            if len(potential_matches) > 10:
+                print(f"   ... and {len(potential_matches) - 10} more potential matches")
+
+def join_sources(restaurants: List[Dict], sources: List[ReferenceSource], ngram: Optional[NgramSettings] = None,
+                 match_cache: Optional[MatchDecisionCache] = None, workers: int = 0) -> List[Dict]:
+    """Left join any number of reference lists onto the restaurants in one pass
+    
+    Each source builds its indexes once and matches every restaurant in a batch; then
+    every restaurant is copied once and annotated with all the sources' fields, so
+    adding a list adds a matching batch but no further pass or copy of the data.
+    With workers, each source's matching is sharded across that many processes.
+    """
+    
+    joins = []
+    for source in sources:
+        join = SourceJoin(source, ngram, match_cache, workers)
+        join.match(restaurants)
+        join.report(restaurants)
+        joins.append(join)
     
-    return None
+    joined_data = []
+    for position, restaurant in enumerate(restaurants):
+        row = restaurant.copy()
+        for join in joins:
+            join.annotate(row, position)
+        joined_data.append(row)
+    
+    return joined_data
+
+def reference_sources(michelin_data: List[Dict], nyt_data: List[Dict], join_key: str = 'name',
+                      exact_keys: Sequence[str] = DEFAULT_EXACT_KEYS, geo_radius: float = 0.0,
+                      michelin_output_file: Optional[str] = None,
+                      nyttop100_output_file: Optional[str] = None,
+                      name_strategies: Sequence[str] = NAME_STRATEGIES) -> List[ReferenceSource]:
+    """The reference lists, joined in this order; add a ReferenceSource to join another list"""
+    
+    return [
+        ReferenceSource(
+            name='michelin', label='Michelin', records=michelin_data, prefix='michelin',
+            fields={'award': 'michelin_award', 'slug': 'slug'}, name_key=join_key,
+            exact_keys=exact_keys, name_strategies=name_strategies, geo_radius=geo_radius,
+            detail=('Award', 'michelin_award'), snapshot_file=michelin_output_file,
+        ),
+        ReferenceSource(
+            name='nyt', label='NYT', records=nyt_data, prefix='nyttop100',
+            fields={'rank': 'rank'}, exact_keys=exact_keys, name_strategies=name_strategies,
+            detail=('Rank', 'rank'), snapshot_file=nyttop100_output_file,
+        ),
+    ]
+
+def save_source_snapshots(joined_data: List[Dict], sources: List[ReferenceSource], ngram: Optional[NgramSettings] = None):
+    """Write each source's snapshot file: the restaurants with the fields of that source and the ones before it"""
+    
+    later_fields = set()
+    for source in reversed(sources):
+        if source.snapshot_file:
+            if later_fields:
+                save_joined_data([{key: value for key, value in row.items() if key not in later_fields}
+                                  for row in joined_data], source.snapshot_file)
+            else:
+                save_joined_data(joined_data, source.snapshot_file)
+        later_fields.update(source.output_fields(ngram))
+
+# Indexes find_best_match built for plain lists, by list identity; the list is kept with its
+# index so its id cannot be reused while cached, and its length catches appends
+LIST_INDEX_CACHE_SIZE = 4
+_list_indexes: Dict[int, Tuple[List[Dict], int, MatchIndex]] = {}
+
+def list_match_index(reference_data: List[Dict]) -> MatchIndex:
+    """MatchIndex of a plain reference list, built on the first lookup and reused after"""
+    cached = _list_indexes.get(id(reference_data))
+    if cached and cached[0] is reference_data and cached[1] == len(reference_data):
+        return cached[2]
+    
+    index = MatchIndex(reference_data)
+    _list_indexes.pop(id(reference_data), None)
+    if len(_list_indexes) >= LIST_INDEX_CACHE_SIZE:
+        _list_indexes.pop(next(iter(_list_indexes)))
+    _list_indexes[id(reference_data)] = (reference_data, len(reference_data), index)
+    return index
 
-def find_best_nyt_match(restaurant_name: str, nyt_data: List[Dict]) -> Dict:
+def find_best_match(restaurant_name: str, reference_data: Union[List[Dict], MatchIndex], data_type: str = "reference",
+                    allowed: Optional[Set[int]] = None) -> Dict:
+    """Find the best match for a restaurant name using various strategies
+    
+    A plain list is indexed on its first lookup and the index reused for later names.
+    """
+    index = reference_data if isinstance(reference_data, MatchIndex) else list_match_index(reference_data)
+    return index.find(restaurant_name, allowed)
+
+def find_best_nyt_match(restaurant_name: str, nyt_data: Union[List[Dict], MatchIndex]) -> Dict:
     """Find the best NYT match for a restaurant name using various strategies"""
     return find_best_match(restaurant_name, nyt_data, "NYT")
 
-def find_best_michelin_match(restaurant_name: str, michelin_data: List[Dict]) -> Dict:
+def find_best_michelin_match(restaurant_name: str, michelin_data: Union[List[Dict], MatchIndex],
+                             allowed: Optional[Set[int]] = None) -> Dict:
     """Find the best Michelin match for a restaurant name using various strategies"""
-    return find_best_match(restaurant_name, michelin_data, "Michelin")
-
-def join_nyt_data(joined_data: List[Dict], nyt_data: List[Dict]) -> List[Dict]:
-    """Left join joined data with NYT data on restaurant name"""
-    
-    print(f"\n🔗 Joining NYT data using 'name' field...")
-    
-    # Join the data
-    final_joined_data = []
-    matched_count = 0
-    potential_matches = []
-    
-    for item in joined_data:
-        # Create a copy of the item
-        final_item = item.copy()
-        
-        # Try to find matching NYT data using enhanced matching
-        nyt_match = find_best_nyt_match(item.get('name', ''), nyt_data)
-        
-        if nyt_match:
-            # Add NYT rank field
-            final_item['nyttop100_rank'] = nyt_match.get('rank', '')
-            matched_count += 1
-            print(f"✅ Matched: '{item.get('name', '')}' ↔ '{nyt_match.get('name', '')}' (Rank: {nyt_match.get('rank', '')})")
-        else:
-            # Add empty NYT rank for unmatched restaurants
-            final_item['nyttop100_rank'] = ''
-            
-            # Check for potential matches (fuzzy matching)
-            original_name = item.get('name', '')
-            for nyt_item in nyt_data:
-                nyt_name = nyt_item.get('name', '')
-                if original_name.lower() in nyt_name.lower() or nyt_name.lower() in original_name.lower():
-                    potential_matches.append({
-                        'restaurant_name': original_name,
-                        'nyt_name': nyt_name,
-                        'nyt_rank': nyt_item.get('rank', '')
-                    })
-        
-        final_joined_data.append(final_item)
-    
-    print(f"✅ Joined {len(final_joined_data)} restaurants")
-    print(f"✅ Matched {matched_count} restaurants with NYT data")
-    print(f"✅ {len(final_joined_data) - matched_count} restaurants without NYT data")
-    
-    # Show potential matches that might need manual review
-    if potential_matches:
-        print(f"\n🔍 Potential matches that might need manual review:")
-        for i, match in enumerate(potential_matches[:10]):  # Show first 10
-            print(f"   {i+1}. '{match['restaurant_name']}' ↔ '{match['nyt_name']}' (Rank: {match['nyt_rank']})")
-        if len(potential_matches) > 10:
-            print(f"   ... and {len(potential_matches) - 10} more potential matches")
-    
-    return final_joined_data
+    return find_best_match(restaurant_name, michelin_data, "Michelin", allowed)
 
 def save_joined_data(data: List[Dict], output_path: str):
     """Save joined data to JSON file"""
@@ -324,6 +700,35 @@ def analyze_join_results(joined_data: List[Dict]):
 def main():
     """Main function to join Michelin and NYT data with restaurant characteristics"""
     
+    parser = argparse.ArgumentParser(description="Join the restaurant characteristics with the Michelin and NYT Top 100 lists")
+    parser.add_argument('--match-mode', choices=['strategies', 'ngram'], default='strategies',
+                        help="'strategies' tries exact, containment and common-word matching per name; "
+                             "'ngram' scores all names at once by character 3-gram TF-IDF similarity (default: strategies)")
+    parser.add_argument('--geo-radius', type=float, default=250,
+                        help="Only match Michelin restaurants within this many meters of the geocoded "
+                             "restaurant; 0 matches by name alone (default: 250)")
+    parser.add_argument('--exact-keys', default=','.join(DEFAULT_EXACT_KEYS),
+                        help="Comma-separated keys matched exactly before any name matching, in order; "
+                             "website and telephone only help with reference lists that have those fields "
+                             "(empty for none; default: %(default)s)")
+    parser.add_argument('--match-cache', default=DEFAULT_MATCH_CACHE,
+                        help=f"SQLite store of match decisions reused by later runs (default: {DEFAULT_MATCH_CACHE})")
+    parser.add_argument('--no-match-cache', action='store_true',
+                        help="Match every restaurant from scratch and store nothing")
+    parser.add_argument('--join-workers', type=int, default=0,
+                        help="Processes matching shards of the restaurants in parallel; worth it for large, "
+                             "multi-year or multi-city inputs (default: 0, match in this process)")
+    parser.add_argument('--top-k', type=int, default=NgramSettings().top_k,
+                        help=f"ngram mode: scored candidates kept per restaurant (default: {NgramSettings().top_k})")
+    parser.add_argument('--min-score', type=float, default=NgramSettings().min_score,
+                        help=f"ngram mode: lowest cosine similarity accepted as a match (default: {NgramSettings().min_score})")
+    args = parser.parse_args()
+    ngram = NgramSettings(args.top_k, args.min_score) if args.match_mode == 'ngram' else None
+    exact_keys = [key.strip() for key in args.exact_keys.split(',') if key.strip()]
+    unknown_keys = [key for key in exact_keys if key not in EXACT_KEY_NORMALIZERS]
+    if unknown_keys:
+        parser.error(f"unknown exact keys: {', '.join(unknown_keys)}")
+    
     print("🔗 NYC Restaurant Week - Michelin & NYT Data Join")
     print("=" * 60)
     
@@ -351,30 +756,25 @@ def main():
         print("❌ Failed to load data files")
         return
     
-    # Step 1: Join with Michelin data
-    print("\n" + "="*50)
-    print("STEP 1: Joining with Michelin data")
-    print("="*50)
+    # Match decisions from earlier runs
+    match_cache = None if args.no_match_cache else MatchDecisionCache(args.match_cache)
     
     # Find best join key for Michelin
     join_key, match_count, total_count = find_best_join_key(characteristics_data, michelin_data)
     
-    # Join the data with Michelin
-    joined_data = join_michelin_data(characteristics_data, michelin_data, join_key)
-    
-    # Save intermediate result
-    save_joined_data(joined_data, michelin_output_file)
+    sources = reference_sources(michelin_data, nyt_data, join_key, exact_keys, args.geo_radius,
+                                michelin_output_file, nyttop100_output_file)
     
-    # Step 2: Join with NYT data
     print("\n" + "="*50)
-    print("STEP 2: Joining with NYT data")
+    print(f"Joining with {', '.join(source.label for source in sources)} data")
     print("="*50)
     
-    # Join with NYT data
-    final_joined_data = join_nyt_data(joined_data, nyt_data)
+    final_joined_data = join_sources(characteristics_data, sources, ngram, match_cache, args.join_workers)
+    if match_cache:
+        match_cache.close()
     
-    # Save final result
-    save_joined_data(final_joined_data, nyttop100_output_file)
+    # Save each stage's file and the final result
+    save_source_snapshots(final_joined_data, sources, ngram)
     
     # Also save as FinalData.json for easy access
     final_data_file = "../data/FinalData.json"
@@ -0,0 +1,87 @@
+from typing import Dict, Iterable, List, Set, Tuple
+
+class ContainmentMatcher:
+    """Aho-Corasick automaton answering "which names contain, or are contained in, this one?"
+
+    The trie holds every suffix of every reference name, so each node is a substring
+    of some reference and records the references containing it, and the references
+    whose full name ends at a node are the automaton's patterns. Reading a name
+    through the automaton once reports every reference it contains (pattern matches
+    along the way) and, when the whole name is still in the trie at the end, every
+    reference that contains it.
+
+    The trie grows with the square of the name lengths, which is fine for restaurant
+    names but not for long documents.
+    """
+
+    def __init__(self, names: Iterable[Tuple[int, str]]):
+        self.goto: List[Dict[str, int]] = [{}]
+        self.fail: List[int] = [0]
+        self.depth: List[int] = [0]
+        self.ends: List[List[int]] = [[]]
+        self.within: List[Set[int]] = [set()]
+
+        for key, name in names:
+            self.within[0].add(key)
+            for start in range(len(name)):
+                node = 0
+                for char in name[start:]:
+                    node = self.child(node, char)
+                    self.within[node].add(key)
+                if start == 0:
+                    self.ends[node].append(key)
+            if not name:
+                self.ends[0].append(key)
+
+        self.output = self.link_failures()
+
+    def child(self, node: int, char: str) -> int:
+        next_node = self.goto[node].get(char)
+        if next_node is None:
+            next_node = len(self.goto)
+            self.goto[node][char] = next_node
+            self.goto.append({})
+            self.fail.append(0)
+            self.depth.append(self.depth[node] + 1)
+            self.ends.append([])
+            self.within.append(set())
+        return next_node
+
+    def link_failures(self) -> List[int]:
+        """Breadth-first failure links, and for each node the nearest node on its
+        failure chain where a pattern ends (0 for none)"""
+
+        output = [0] * len(self.goto)
+        queue = list(self.goto[0].values())
+        for node in queue:
+            for char, next_node in self.goto[node].items():
+                fallback = self.fail[node]
+                while fallback and char not in self.goto[fallback]:
+                    fallback = self.fail[fallback]
+                self.fail[next_node] = self.goto[fallback].get(char, 0)
+
+                failed_to = self.fail[next_node]
+                output[next_node] = failed_to if self.ends[failed_to] and failed_to else output[failed_to]
+                queue.append(next_node)
+        return output
+
+    def related(self, text: str) -> List[int]:
+        """Keys of the names that text contains or is contained in, sorted"""
+
+        found = set(self.ends[0])
+        state = 0
+        for char in text:
+            while state and char not in self.goto[state]:
+                state = self.fail[state]
+            state = self.goto[state].get(char, 0)
+
+            node = state if self.ends[state] else self.output[state]
+            while node:
+                found.update(self.ends[node])
+                node = self.output[node]
+
+        # The longest suffix of text in the trie is text itself only if text is a substring of some name
+        if self.depth[state] == len(text):
+            found |= self.within[state]
+
+        return sorted(found)
@@ -0,0 +1,110 @@
+import time
+import argparse
+import importlib
+import tracemalloc
+from typing import Dict, List, Tuple
+
+from page_cache import PageCache, DEFAULT_CACHE_DIR
+from html_backends import BACKENDS, available_backends
+
+REFERENCE_BACKEND = 'html.parser'
+
+def load_recorded_pages(cache_dir: str, limit: int) -> List[Tuple[str, str]]:
+    """Restaurant pages recorded in the page cache by the geocoder stage"""
+
+    cache = PageCache(cache_dir, offline=True)
+    pages = []
+    for url, body in cache.iter_pages():
+        pages.append((url, body))
+        if limit and len(pages) >= limit:
+            break
+    cache.close()
+    return pages
+
+def benchmark_backend(name: str, pages: List[Tuple[str, str]], repeat: int,
+                      reference: Dict[str, Dict]) -> Dict:
+    """Parse time, peak Python heap and extraction equivalence of one backend"""
+
+    build = BACKENDS[name]
+    extractor = importlib.import_module('3_Characteristics').RestaurantCharacteristicsExtractor()
+
+    # Parse time: best of `repeat` passes over every page
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _, body in pages:
+            build(body)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+
+    # Peak memory of a single parse (tracemalloc only sees allocations made through Python)
+    peak = 0
+    tracemalloc.start()
+    for _, body in pages:
+        tracemalloc.reset_peak()
+        build(body)
+        peak = max(peak, tracemalloc.get_traced_memory()[1])
+    tracemalloc.stop()
+
+    # Equivalence: the characteristics extracted must match the reference backend's
+    mismatches = []
+    for url, body in pages:
+        result = extractor.extract_view(build(body))
+        if result != reference[url]:
+            mismatches.append(url)
+
+    return {
+        'backend': name,
+        'seconds': best,
+        'pages_per_second': len(pages) / best if best else 0.0,
+        'peak_kb': peak / 1024,
+        'mismatches': mismatches,
+    }
+
+def reference_results(pages: List[Tuple[str, str]]) -> Dict[str, Dict]:
+    build = BACKENDS[REFERENCE_BACKEND]
+    extractor = importlib.import_module('3_Characteristics').RestaurantCharacteristicsExtractor()
+    return {url: extractor.extract_view(build(body)) for url, body in pages}
+
+def main():
+    """Main function"""
+
+    parser = argparse.ArgumentParser(description="Compare the installed HTML backends on pages recorded in the page cache")
+    parser.add_argument('--cache-dir', default=DEFAULT_CACHE_DIR,
+                        help=f"Page cache to read recorded pages from (default: {DEFAULT_CACHE_DIR})")
+    parser.add_argument('--limit', type=int, default=0,
+                        help="Only use the first N recorded pages (default: all)")
+    parser.add_argument('--repeat', type=int, default=3,
+                        help="Timed passes per backend; the best one is reported (default: 3)")
+    args = parser.parse_args()
+
+    pages = load_recorded_pages(args.cache_dir, args.limit)
+    if not pages:
+        print(f"❌ No recorded pages in {args.cache_dir}; run 2_Geocoder.py first to fill the page cache")
+        return
+
+    backends = available_backends()
+    print(f"📂 Benchmarking {len(backends)} backends on {len(pages)} recorded pages "
+          f"({sum(len(body) for _, body in pages) / 1024 / 1024:.1f} MB of HTML)")
+
+    reference = reference_results(pages)
+    results = [benchmark_backend(name, pages, args.repeat, reference) for name in backends]
+
+    print(f"\n{'Backend':<14}{'Parse time':>12}{'Pages/s':>10}{'Peak KB':>10}{'Mismatches':>12}")
+    for result in results:
+        print(f"{result['backend']:<14}{result['seconds']:>11.3f}s{result['pages_per_second']:>10.1f}"
+              f"{result['peak_kb']:>10.0f}{len(result['mismatches']):>12}")
+
+    for result in results:
+        if result['mismatches']:
+            print(f"\n⚠️  {result['backend']} extracts different characteristics than {REFERENCE_BACKEND} on:")
+            for url in result['mismatches'][:5]:
+                print(f"   {url}")
+
+    identical = [result for result in results if not result['mismatches']]
+    fastest = min(identical, key=lambda result: result['seconds'])
+    print(f"\n🏁 Fastest backend with identical results: {fastest['backend']} "
+          f"(use --html-backend {fastest['backend']})")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+import json
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Optional, Set
+
+DEFAULT_JOURNAL = "../data/NYCRestaurantWeek/checkpoints.sqlite"
+
+class CheckpointJournal:
+    """SQLite journal of completed units of work (pages, slugs) for one pipeline stage
+
+    Every unit is recorded as soon as it finishes, together with its result, so a
+    --resume run can skip whatever already succeeded and only redo missing or failed
+    units. One file holds the journals of all stages, keyed by stage name.
+    """
+
+    def __init__(self, stage: str, path: str = DEFAULT_JOURNAL):
+        self.stage = stage
+        self.path = path
+        self.lock = threading.Lock()
+
+        # Shared by the worker threads; the lock serialises writes
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self.connection.execute("""
+            CREATE TABLE IF NOT EXISTS units (
+                stage TEXT NOT NULL,
+                key TEXT NOT NULL,
+                status TEXT NOT NULL,
+                result TEXT,
+                error TEXT,
+                updated_at REAL NOT NULL,
+                PRIMARY KEY (stage, key)
+            )
+        """)
+        self.connection.commit()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def record(self, key: str, result: Any):
+        """Mark a unit as done and store its result"""
+        self._write(key, 'done', json.dumps(result, ensure_ascii=False), None)
+
+    def record_failure(self, key: str, error: str):
+        """Mark a unit as failed so --resume retries it"""
+        self._write(key, 'failed', None, error)
+
+    def _write(self, key: str, status: str, result: Optional[str], error: Optional[str]):
+        with self.lock:
+            self.connection.execute(
+                "INSERT OR REPLACE INTO units (stage, key, status, result, error, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (self.stage, key, status, result, error, time.time())
+            )
+            self.connection.commit()
+
+    def completed(self) -> Dict[str, Any]:
+        """Results of every unit already done in this stage, by key"""
+
+        with self.lock:
+            rows = self.connection.execute(
+                "SELECT key, result FROM units WHERE stage = ? AND status = 'done'",
+                (self.stage,)
+            ).fetchall()
+        return {key: json.loads(result) for key, result in rows}
+
+    def completed_keys(self) -> Set[str]:
+        """Keys of every unit already done in this stage, without loading their results"""
+
+        with self.lock:
+            rows = self.connection.execute(
+                "SELECT key FROM units WHERE stage = ? AND status = 'done'",
+                (self.stage,)
+            ).fetchall()
+        return {key for key, in rows}
+
+    def result(self, key: str) -> Optional[Any]:
+        """Stored result of one done unit, or None"""
+
+        with self.lock:
+            row = self.connection.execute(
+                "SELECT result FROM units WHERE stage = ? AND key = ? AND status = 'done'",
+                (self.stage, key)
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def counts(self) -> Dict[str, int]:
+        """Number of units per status in this stage"""
+
+        with self.lock:
+            rows = self.connection.execute(
+                "SELECT status, COUNT(*) FROM units WHERE stage = ? GROUP BY status",
+                (self.stage,)
+            ).fetchall()
+        return dict(rows)
+
+    def reset(self):
+        """Forget this stage's journal, for a fresh run"""
+
+        with self.lock:
+            self.connection.execute("DELETE FROM units WHERE stage = ?", (self.stage,))
+            self.connection.commit()
+
+    def close(self):
+        self.connection.close()
+
+def open_journal(stage: str, resume: bool, path: str = DEFAULT_JOURNAL) -> CheckpointJournal:
+    """Open a stage's journal, reporting what a resume will skip or clearing it for a fresh run"""
+
+    journal = CheckpointJournal(stage, path)
+
+    if resume:
+        counts = journal.counts()
+        print(f"♻️  Resuming '{stage}': {counts.get('done', 0)} units done, "
+              f"{counts.get('failed', 0)} failed units will be retried")
+    else:
+        journal.reset()
+
+    return journal
+
+def close_journal(journal: CheckpointJournal):
+    """Clear the journal after a clean run; keep it when units failed so --resume can retry them"""
+
+    failed = journal.counts().get('failed', 0)
+    if failed:
+        print(f"💡 {failed} unit(s) failed, re-run with --resume to fetch only those")
+    else:
+        journal.reset()
+    journal.close()
@@ -0,0 +1,236 @@
+import io
+import os
+import sys
+import json
+import time
+import argparse
+import importlib
+import contextlib
+from typing import Dict, List, NamedTuple, Optional, Sequence
+
+from ngram_join import NgramSettings
+
+join_data = importlib.import_module('4_join_data')
+
+GOLD_FILE = "../data/NYCRestaurantWeek/join_gold.json"
+BASELINE_FILE = "../data/NYCRestaurantWeek/join_eval_baseline.json"
+
+CHARACTERISTICS_FILE = "../data/NYCRestaurantWeek/3_Characteristics.json"
+MICHELIN_FILE = "../data/Lists/MichelinNYC.json"
+NYT_FILE = "../data/Lists/NYTTop100.json"
+
+QUALITY_METRICS = ['precision', 'recall', 'f1']
+
+class MatcherConfig(NamedTuple):
+    """One way of running the join, as 4_join_data.py's options would set it up"""
+    name: str
+    ngram: Optional[NgramSettings] = None
+    exact_keys: Sequence[str] = ()
+    name_strategies: Sequence[str] = join_data.NAME_STRATEGIES
+    geo_radius: float = 0.0
+
+CONFIGS = [
+    # Each matcher on its own, so a strategy that stops finding its matches shows up in recall
+    MatcherConfig('exact-keys', exact_keys=join_data.DEFAULT_EXACT_KEYS, name_strategies=()),
+    MatcherConfig('exact-name', name_strategies=('exact',)),
+    MatcherConfig('containment', name_strategies=('containment',)),
+    MatcherConfig('word-overlap', name_strategies=('words',)),
+    # The modes 4_join_data.py runs
+    MatcherConfig('strategies'),
+    MatcherConfig('strategies+exact', exact_keys=join_data.DEFAULT_EXACT_KEYS),
+    MatcherConfig('strategies+exact+geo', exact_keys=join_data.DEFAULT_EXACT_KEYS, geo_radius=250),
+    MatcherConfig('ngram', ngram=NgramSettings()),
+    MatcherConfig('ngram+exact+geo', ngram=NgramSettings(), exact_keys=join_data.DEFAULT_EXACT_KEYS, geo_radius=250),
+]
+
+def load_gold(path: str, restaurants: List[Dict]) -> List[Dict]:
+    """Labeled rows of the gold file, with the position of each restaurant
+
+    Each row names a restaurant and, per source, the reference name it should match
+    or null when it should match nothing; a source left out of a row is not labeled
+    for it and is not scored. A row may carry its own `restaurant` record for a case
+    the scraped data lacks (a branch suffix, a typographic quote); it is appended to
+    the restaurants.
+    """
+    positions = {}
+    for position, restaurant in enumerate(restaurants):
+        positions.setdefault(restaurant.get('name', ''), position)
+
+    gold = []
+    for row in join_data.load_json_file(path):
+        if 'restaurant' in row:
+            restaurants.append(row['restaurant'])
+            gold.append({**row, 'name': row['restaurant']['name'], 'position': len(restaurants) - 1})
+            continue
+        if row['name'] not in positions:
+            print(f"⚠️ Gold restaurant not in the characteristics data, skipped: {row['name']}")
+            continue
+        gold.append({**row, 'position': positions[row['name']]})
+    return gold
+
+def quality(counts: Dict[str, int]) -> Dict[str, float]:
+    tp, fp, fn = counts['tp'], counts['fp'], counts['fn']
+    precision = tp / (tp + fp) if tp + fp else 1.0
+    recall = tp / (tp + fn) if tp + fn else 1.0
+    f1 = 2 * precision * recall / (precision + recall) if precision + recall else 0.0
+    return {'precision': precision, 'recall': recall, 'f1': f1}
+
+def evaluate_config(config: MatcherConfig, restaurants: List[Dict], michelin_data: List[Dict],
+                    nyt_data: List[Dict], join_key: str, gold: List[Dict], repeat: int) -> Dict:
+    """Accuracy on the gold rows and matching speed over every restaurant, for one configuration
+
+    A wrong match counts as a false positive and, when the row should have matched
+    something, also as a false negative. Speed is the best of `repeat` timed matches
+    of all the restaurants against every source, with the indexes already built;
+    n-gram mode scores a whole batch at once, so its latency is the amortized cost
+    of a row.
+    """
+    sources = join_data.reference_sources(michelin_data, nyt_data, join_key, config.exact_keys, config.geo_radius,
+                                          name_strategies=config.name_strategies)
+
+    counts = {'tp': 0, 'fp': 0, 'fn': 0}
+    errors = []
+    seconds = 0.0
+    for source in sources:
+        # The join's progress messages would bury the report
+        with contextlib.redirect_stdout(io.StringIO()):
+            join = join_data.SourceJoin(source, config.ngram)
+            if config.ngram:
+                join.match_index.ngram_matcher()
+
+            best = None
+            for _ in range(repeat):
+                start = time.perf_counter()
+                join.match(restaurants)
+                elapsed = time.perf_counter() - start
+                best = elapsed if best is None else min(best, elapsed)
+        seconds += best
+
+        for row in gold:
+            if source.name not in row:
+                continue
+            expected = row[source.name]
+            i, _ = join.matches[row['position']]
+            predicted = source.records[i].get('name') if i is not None else None
+
+            if predicted == expected:
+                counts['tp'] += predicted is not None
+                continue
+            if predicted is not None:
+                counts['fp'] += 1
+            if expected is not None:
+                counts['fn'] += 1
+            errors.append((source.label, row['name'], predicted, expected))
+
+    matched_rows = len(restaurants) * len(sources)
+    return {
+        'config': config.name,
+        **counts,
+        **quality(counts),
+        'matches_per_second': matched_rows / seconds if seconds else 0.0,
+        'latency_us': seconds / matched_rows * 1e6 if matched_rows else 0.0,
+        'errors': errors,
+    }
+
+def regressions(results: List[Dict], baseline: Dict[str, Dict], max_slowdown: float) -> List[str]:
+    """What got worse than the baseline: any drop in accuracy, or throughput down by more than max_slowdown"""
+
+    found = []
+    for result in results:
+        expected = baseline.get(result['config'])
+        if not expected:
+            print(f"⚠️ No baseline for {result['config']}; run with --update-baseline to record one")
+            continue
+
+        for metric in QUALITY_METRICS:
+            # The baseline keeps 4 decimals
+            if round(result[metric], 4) < expected[metric]:
+                found.append(f"{result['config']}: {metric} {result[metric]:.3f} < baseline {expected[metric]:.3f}")
+
+        floor = expected['matches_per_second'] * (1 - max_slowdown)
+        if result['matches_per_second'] < floor:
+            found.append(f"{result['config']}: {result['matches_per_second']:.0f} matches/s < "
+                         f"{floor:.0f} ({max_slowdown:.0%} below baseline {expected['matches_per_second']:.0f})")
+    return found
+
+def save_baseline(results: List[Dict], path: str):
+    baseline = {result['config']: {**{metric: round(result[metric], 4) for metric in QUALITY_METRICS},
+                                   'matches_per_second': round(result['matches_per_second'], 1)}
+                for result in results}
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(baseline, f, indent=2, ensure_ascii=False)
+    print(f"💾 Saved baseline to: {path}")
+
+def main():
+    """Main function"""
+
+    parser = argparse.ArgumentParser(description="Score every join configuration against the labeled gold pairs "
+                                                 "and fail if accuracy or throughput regressed")
+    parser.add_argument('--gold', default=GOLD_FILE,
+                        help=f"Labeled (restaurant, Michelin name, NYT name) rows (default: {GOLD_FILE})")
+    parser.add_argument('--baseline', default=BASELINE_FILE,
+                        help=f"Results to compare with (default: {BASELINE_FILE})")
+    parser.add_argument('--update-baseline', action='store_true',
+                        help="Record these results as the new baseline instead of comparing")
+    parser.add_argument('--repeat', type=int, default=5,
+                        help="Timed matches per configuration; the best one is reported (default: 5)")
+    parser.add_argument('--max-slowdown', type=float, default=0.3,
+                        help="Allowed drop in matches per second before it counts as a regression; "
+                             "throughput depends on the machine, so record the baseline on the one "
+                             "that runs the check (default: 0.3)")
+    args = parser.parse_args()
+
+    restaurants = join_data.load_json_file(CHARACTERISTICS_FILE)
+    michelin_data = join_data.load_json_file(MICHELIN_FILE)
+    nyt_data = (join_data.load_json_file(NYT_FILE) or {}).get('restaurants', [])
+    if not restaurants or not michelin_data or not nyt_data:
+        print("❌ Failed to load data files")
+        sys.exit(1)
+
+    gold = load_gold(args.gold, restaurants)
+    with contextlib.redirect_stdout(io.StringIO()):
+        join_key, _, _ = join_data.find_best_join_key(restaurants, michelin_data)
+
+    labeled = {name: sum(1 for row in gold if name in row) for name in ('michelin', 'nyt')}
+    print(f"📂 Evaluating {len(CONFIGS)} join configurations on {len(gold)} gold restaurants "
+          f"({labeled['michelin']} labeled for Michelin, {labeled['nyt']} for NYT) "
+          f"and {len(restaurants)} restaurants for speed")
+
+    results = [evaluate_config(config, restaurants, michelin_data, nyt_data, join_key, gold, args.repeat)
+               for config in CONFIGS]
+
+    print(f"\n{'Configuration':<22}{'TP':>5}{'FP':>5}{'FN':>5}{'Precision':>11}{'Recall':>8}{'F1':>7}"
+          f"{'Matches/s':>11}{'µs/match':>10}")
+    for result in results:
+        print(f"{result['config']:<22}{result['tp']:>5}{result['fp']:>5}{result['fn']:>5}"
+              f"{result['precision']:>11.3f}{result['recall']:>8.3f}{result['f1']:>7.3f}"
+              f"{result['matches_per_second']:>11.0f}{result['latency_us']:>10.1f}")
+
+    for result in results:
+        if result['errors']:
+            print(f"\n🔍 {result['config']} disagrees with the gold set on:")
+            for label, name, predicted, expected in result['errors'][:10]:
+                print(f"   {label}: '{name}' matched {predicted!r}, expected {expected!r}")
+            if len(result['errors']) > 10:
+                print(f"   ... and {len(result['errors']) - 10} more")
+
+    if args.update_baseline:
+        save_baseline(results, args.baseline)
+        return
+
+    if not os.path.exists(args.baseline):
+        print(f"⚠️ No baseline at {args.baseline}; run with --update-baseline to record one")
+        return
+    with open(args.baseline, 'r', encoding='utf-8') as f:
+        baseline = json.load(f)
+
+    found = regressions(results, baseline, args.max_slowdown)
+    if found:
+        print("\n❌ Regressions against the baseline:")
+        for regression in found:
+            print(f"   {regression}")
+        sys.exit(1)
+    print("\n✅ No regressions against the baseline")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,303 @@
+import re
+import json
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+from page_view import Anchor, PageView
+
+# The regex parser, to work out which characters a rule can start with
+try:
+    from re import _parser as sre_parse, _constants as sre_constants
+except ImportError:  # Python < 3.11
+    import sre_parse
+    import sre_constants
+
+class RegexRule(NamedTuple):
+    """Value of the first match of a pattern in the page text"""
+    pattern: str
+    flags: int = 0
+    group: int = 0
+    transform: Optional[Callable[[str], str]] = None
+
+class AnchorRule(NamedTuple):
+    """href of the first <a> link the predicate accepts"""
+    predicate: Callable[[Anchor], bool]
+
+class JsonPathRule(NamedTuple):
+    """Value at a dotted path ('*' matches any key or list item) in the page's JSON scripts"""
+    path: str
+
+class Field(NamedTuple):
+    """An output field and its rules, tried in order; the first rule that finds a value wins"""
+    name: str
+    rules: Sequence[Any]
+
+def inline_flags(flags: int) -> str:
+    letters = ''
+    if flags & re.IGNORECASE:
+        letters += 'i'
+    if flags & re.DOTALL:
+        letters += 's'
+    if flags & re.MULTILINE:
+        letters += 'm'
+    if flags & re.VERBOSE:
+        letters += 'x'
+    return letters
+
+CATEGORY_CLASSES = {
+    sre_constants.CATEGORY_DIGIT: r'\d',
+    sre_constants.CATEGORY_NOT_DIGIT: r'\D',
+    sre_constants.CATEGORY_SPACE: r'\s',
+    sre_constants.CATEGORY_NOT_SPACE: r'\S',
+    sre_constants.CATEGORY_WORD: r'\w',
+    sre_constants.CATEGORY_NOT_WORD: r'\W',
+}
+
+def literal_class(code: int, ignore_case: bool) -> List[str]:
+    char = chr(code)
+    variants = {char, char.lower(), char.upper()} if ignore_case else {char}
+    return [re.escape(variant) for variant in sorted(variants)]
+
+def first_char_class(items, ignore_case: bool) -> Tuple[Optional[List[str]], bool]:
+    """Character class pieces a parsed pattern can start with, and whether it can match empty
+
+    Returns (None, _) when the start cannot be described by a character class.
+    """
+
+    pieces = []
+    for op, av in items:
+        if op is sre_constants.LITERAL:
+            return pieces + literal_class(av, ignore_case), False
+
+        if op is sre_constants.IN:
+            for item_op, item_av in av:
+                if item_op is sre_constants.LITERAL:
+                    pieces += literal_class(item_av, ignore_case)
+                elif item_op is sre_constants.RANGE and not ignore_case:
+                    pieces.append(f"{re.escape(chr(item_av[0]))}-{re.escape(chr(item_av[1]))}")
+                elif item_op is sre_constants.CATEGORY and item_av in CATEGORY_CLASSES:
+                    pieces.append(CATEGORY_CLASSES[item_av])
+                else:
+                    return None, False
+            return pieces, False
+
+        if op in (sre_constants.MAX_REPEAT, sre_constants.MIN_REPEAT):
+            minimum, _, sub = av
+            sub_pieces, nullable = first_char_class(sub, ignore_case)
+            if sub_pieces is None:
+                return None, False
+            pieces += sub_pieces
+            if minimum > 0 and not nullable:
+                return pieces, False
+            continue
+
+        if op is sre_constants.SUBPATTERN:
+            _, add_flags, del_flags, sub = av
+            sub_ignore_case = (ignore_case or bool(add_flags & re.IGNORECASE)) and not del_flags & re.IGNORECASE
+            sub_pieces, nullable = first_char_class(sub, sub_ignore_case)
+            if sub_pieces is None:
+                return None, False
+            pieces += sub_pieces
+            if not nullable:
+                return pieces, False
+            continue
+
+        if op is sre_constants.BRANCH:
+            branch_nullable = False
+            for branch in av[1]:
+                branch_pieces, nullable = first_char_class(branch, ignore_case)
+                if branch_pieces is None:
+                    return None, False
+                pieces += branch_pieces
+                branch_nullable = branch_nullable or nullable
+            if not branch_nullable:
+                return pieces, False
+            continue
+
+        if op is sre_constants.AT:
+            # Anchors such as \b consume nothing
+            continue
+
+        return None, False
+
+    return pieces, True
+
+def parse_json_scripts(scripts: List[str]) -> List[Any]:
+    """Decode the <script> bodies that are plain JSON (such as __NEXT_DATA__ or JSON-LD)"""
+
+    documents = []
+    for script in scripts:
+        body = script.strip()
+        if body[:1] in ('{', '['):
+            try:
+                documents.append(json.loads(body))
+            except ValueError:
+                continue
+    return documents
+
+def resolve_json_path(document: Any, keys: List[str]) -> Optional[Any]:
+    """First value found at a path of keys, '*' matching every key or list item"""
+
+    if not keys:
+        return document
+
+    key, rest = keys[0], keys[1:]
+    if key == '*':
+        children = document.values() if isinstance(document, dict) else document if isinstance(document, list) else []
+        for child in children:
+            value = resolve_json_path(child, rest)
+            if value is not None:
+                return value
+        return None
+
+    if isinstance(document, dict) and key in document:
+        return resolve_json_path(document[key], rest)
+    if isinstance(document, list) and key.isdigit() and int(key) < len(document):
+        return resolve_json_path(document[int(key)], rest)
+    return None
+
+class RuleRegistry:
+    """Fields declared as rules and compiled into a single scanner over the page text
+
+    Every regex rule of every field becomes one alternative of a combined pattern, so
+    the text is scanned once however many fields are declared. The combined pattern
+    only finds candidate positions: at each one the still-unresolved rules are
+    matched there individually, and scanning resumes one character later, so a match
+    of one rule never hides an overlapping match of another. Each rule therefore gets
+    exactly its own first match, and the scan stops as soon as no field can change.
+    """
+
+    def __init__(self, fields: Sequence[Field]):
+        self.fields = list(fields)
+
+        # Flatten the regex rules; (field index, rule index) -> position in self.regex_rules
+        self.regex_rules = []
+        self.regex_slots = {}
+        for field_index, field in enumerate(self.fields):
+            for rule_index, rule in enumerate(field.rules):
+                if isinstance(rule, RegexRule):
+                    self.regex_slots[(field_index, rule_index)] = len(self.regex_rules)
+                    self.regex_rules.append(rule)
+
+        self.compiled_rules = [re.compile(rule.pattern, rule.flags) for rule in self.regex_rules]
+
+        self.scanner = self.compile_scanner(self.regex_rules)
+
+        self.uses_json = any(isinstance(rule, JsonPathRule) for field in self.fields for rule in field.rules)
+
+    @staticmethod
+    def compile_scanner(rules: List[RegexRule]) -> Optional[re.Pattern]:
+        """One pattern matching wherever any rule matches
+
+        When every rule's possible first characters are known the scanner starts with
+        that character class, which lets the regex engine skip straight to candidate
+        positions instead of trying every alternative at every character; a width-one
+        lookbehind then checks the alternatives at the candidate.
+        """
+
+        if not rules:
+            return None
+
+        alternatives = []
+        first_chars = []
+        for rule in rules:
+            letters = inline_flags(rule.flags)
+            alternatives.append(f"(?{letters}:{rule.pattern})" if letters else f"(?:{rule.pattern})")
+
+            if first_chars is not None:
+                pieces, nullable = first_char_class(sre_parse.parse(rule.pattern, rule.flags).data,
+                                                    bool(rule.flags & re.IGNORECASE))
+                first_chars = None if pieces is None or nullable else first_chars + pieces
+
+        combined = '|'.join(alternatives)
+        if first_chars is None:
+            return re.compile(combined)
+
+        prefix = '[' + ''.join(dict.fromkeys(first_chars)) + ']'
+        return re.compile(f"{prefix}(?<=(?={combined})(?s:.))")
+
+    def scan(self, text: str, needed: Dict[int, List[int]]) -> Dict[int, re.Match]:
+        """First match of every needed regex rule, keyed by its position in regex_rules
+
+        needed maps each unsettled field to its regex rules in priority order.
+        """
+
+        found = {}
+        unresolved = sorted({slot for slots in needed.values() for slot in slots})
+        position = 0
+
+        while unresolved:
+            candidate = self.scanner.search(text, position)
+            if not candidate:
+                break
+
+            start = candidate.start()
+            for slot in unresolved:
+                match = self.compiled_rules[slot].match(text, start)
+                if match:
+                    found[slot] = match
+            unresolved = [slot for slot in unresolved if slot not in found]
+
+            # A field is settled once its highest-priority remaining rule has matched
+            needed = {field: slots for field, slots in needed.items() if slots[0] not in found}
+            unresolved = [slot for slot in unresolved if any(slot in slots for slots in needed.values())]
+
+            position = start + 1
+
+        return found
+
+    def extract(self, view: PageView) -> Dict[str, Any]:
+        """Evaluate every field against a parsed page; fields without a value are left out"""
+
+        documents = parse_json_scripts(view.scripts) if self.uses_json else []
+
+        # Link and JSON rules are cheap; they decide which regex rules still matter
+        direct = {}
+        needed = {}
+        for field_index, field in enumerate(self.fields):
+            slots = []
+            for rule_index, rule in enumerate(field.rules):
+                if isinstance(rule, RegexRule):
+                    slots.append(self.regex_slots[(field_index, rule_index)])
+                    continue
+
+                value = self.evaluate_direct(rule, view, documents)
+                if value is not None:
+                    direct[field_index] = (rule_index, value)
+                    break
+            if slots:
+                needed[field_index] = slots
+
+        found = self.scan(view.text, needed) if needed and self.scanner else {}
+
+        values = {}
+        for field_index, field in enumerate(self.fields):
+            for rule_index, rule in enumerate(field.rules):
+                if field_index in direct and direct[field_index][0] == rule_index:
+                    values[field.name] = direct[field_index][1]
+                    break
+
+                slot = self.regex_slots.get((field_index, rule_index))
+                if slot is not None and slot in found:
+                    value = found[slot].group(rule.group)
+                    values[field.name] = rule.transform(value) if rule.transform else value
+                    break
+
+        return values
+
+    @staticmethod
+    def evaluate_direct(rule: Any, view: PageView, documents: List[Any]) -> Optional[Any]:
+        if isinstance(rule, AnchorRule):
+            for link in view.anchors:
+                if rule.predicate(link):
+                    return link.href
+            return None
+
+        if isinstance(rule, JsonPathRule):
+            keys = rule.path.split('.')
+            for document in documents:
+                value = resolve_json_path(document, keys)
+                if value is not None:
+                    return value
+            return None
+
+        raise TypeError(f"Unknown rule type: {type(rule).__name__}")
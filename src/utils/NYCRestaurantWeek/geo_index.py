@@ -0,0 +1,66 @@
+import math
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional, Tuple
+
+EARTH_RADIUS_METERS = 6371000
+METERS_PER_DEGREE_LATITUDE = 111320
+
+def item_coordinates(item: Dict) -> Optional[Tuple[float, float]]:
+    """(latitude, longitude) of a record, or None when it was not geocoded"""
+
+    lat, lon = item.get('latitude'), item.get('longitude')
+    if isinstance(lat, (int, float)) and isinstance(lon, (int, float)):
+        return float(lat), float(lon)
+    return None
+
+def haversine_meters(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    """Great-circle distance between two points"""
+
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    dphi = phi2 - phi1
+    dlambda = math.radians(lon2 - lon1)
+    h = math.sin(dphi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(dlambda / 2) ** 2
+    return 2 * EARTH_RADIUS_METERS * math.asin(math.sqrt(h))
+
+class GridIndex:
+    """Points bucketed into a grid of cells about radius_meters wide
+
+    Everything within the radius of a query point lies in its cell or one of the
+    eight around it, so a lookup measures the distance to a handful of points
+    instead of the whole list. Cells are sized at the latitude farthest from the
+    equator, where a degree of longitude is shortest, so they are wide enough for
+    every point.
+    """
+
+    def __init__(self, points: Iterable[Tuple[int, float, float]], radius_meters: float):
+        points = list(points)
+        self.radius_meters = radius_meters
+        self.coordinates = {key: (lat, lon) for key, lat, lon in points}
+
+        widest_latitude = max((abs(lat) for _, lat, _ in points), default=0.0)
+        self.lat_step = radius_meters / METERS_PER_DEGREE_LATITUDE
+        self.lon_step = self.lat_step / max(math.cos(math.radians(widest_latitude)), 0.01)
+
+        self.cells = defaultdict(list)
+        for key, lat, lon in points:
+            self.cells[self.cell(lat, lon)].append(key)
+
+    def __len__(self):
+        return len(self.coordinates)
+
+    def cell(self, lat: float, lon: float) -> Tuple[int, int]:
+        return math.floor(lat / self.lat_step), math.floor(lon / self.lon_step)
+
+    def within(self, lat: float, lon: float) -> List[int]:
+        """Keys of the points within the radius, in key order"""
+
+        row, column = self.cell(lat, lon)
+
+        nearby = []
+        for d_row in (-1, 0, 1):
+            for d_column in (-1, 0, 1):
+                for key in self.cells.get((row + d_row, column + d_column), ()):
+                    point_lat, point_lon = self.coordinates[key]
+                    if haversine_meters(lat, lon, point_lat, point_lon) <= self.radius_meters:
+                        nearby.append(key)
+        return sorted(nearby)
@@ -0,0 +1,108 @@
+from typing import Callable, Dict, List
+
+from page_view import Anchor, PageView, build_page_view
+
+# Optional fast parsers; html.parser (through BeautifulSoup) is always available
+try:
+    from selectolax.lexbor import LexborHTMLParser
+except ImportError:
+    LexborHTMLParser = None
+
+try:
+    import lxml.html
+    import lxml.etree
+except ImportError:
+    lxml = None
+
+# Fastest first. html.parser is the default: selectolax and lxml keep the text of
+# <template>/<noscript> that it leaves out, so they are opt-in through --html-backend
+# once benchmark_html_backends.py shows identical results on the recorded pages
+PREFERRED_BACKENDS = ['selectolax', 'lxml', 'html.parser']
+DEFAULT_BACKEND = 'html.parser'
+
+def selectolax_text(node) -> str:
+    """Text under a lexbor node, leaving out script and style bodies like soup.get_text()"""
+    return ''.join(child.text_content for child in node.traverse(include_text=True)
+                   if child.tag == '-text' and child.parent.tag not in ('script', 'style'))
+
+def selectolax_page_view(page_content: str) -> PageView:
+    """PageView built from the lexbor HTML5 parser"""
+
+    tree = LexborHTMLParser(page_content)
+    if tree.root is None:
+        return PageView('', [], [])
+
+    anchors = []
+    scripts = []
+
+    for node in tree.root.traverse():
+        tag = node.tag
+        if tag == 'script':
+            scripts.append(node.text(deep=True))
+        elif tag == 'a':
+            attributes = node.attributes
+            if 'href' in attributes:
+                anchors.append(Anchor(attributes['href'] or '', selectolax_text(node)))
+
+    return PageView(selectolax_text(tree.root), anchors, scripts)
+
+def lxml_page_view(page_content: str) -> PageView:
+    """PageView built from libxml2's HTML parser"""
+
+    parser = lxml.html.HTMLParser(encoding='utf-8')
+    try:
+        root = lxml.html.document_fromstring(page_content.encode('utf-8'), parser=parser)
+    except lxml.etree.ParserError:
+        # Empty document
+        return PageView('', [], [])
+
+    scripts = [script.text or '' for script in root.iter('script')]
+
+    # Drop script and style bodies (keeping the text after them) so itertext() matches soup.get_text()
+    lxml.etree.strip_elements(root, 'script', 'style', with_tail=False)
+
+    anchors = [Anchor(link.get('href'), link.text_content()) for link in root.iter('a') if link.get('href') is not None]
+    return PageView(''.join(root.itertext()), anchors, scripts)
+
+def html_parser_page_view(page_content: str) -> PageView:
+    """PageView built by BeautifulSoup on the pure-Python html.parser"""
+    return build_page_view(page_content, 'html.parser')
+
+BACKENDS: Dict[str, Callable[[str], PageView]] = {
+    'selectolax': selectolax_page_view,
+    'lxml': lxml_page_view,
+    'html.parser': html_parser_page_view,
+}
+
+def available_backends() -> List[str]:
+    """Installed backends, fastest first"""
+
+    installed = {
+        'selectolax': LexborHTMLParser is not None,
+        'lxml': lxml is not None,
+        'html.parser': True,
+    }
+    return [name for name in PREFERRED_BACKENDS if installed[name]]
+
+def resolve_backend(name: str = DEFAULT_BACKEND) -> str:
+    """Backend name for an explicit choice, checking that it is installed"""
+
+    available = available_backends()
+    if name not in available:
+        raise ValueError(f"HTML backend '{name}' is not installed (available: {', '.join(available)})")
+    return name
+
+_default_backend = DEFAULT_BACKEND
+
+def set_default_backend(name: str):
+    """Choose the backend parse_page_view uses for this process"""
+
+    global _default_backend
+    _default_backend = resolve_backend(name)
+
+def default_backend() -> str:
+    return _default_backend
+
+def parse_page_view(page_content: str) -> PageView:
+    """Build a PageView with the process-wide default backend"""
+    return BACKENDS[_default_backend](page_content)
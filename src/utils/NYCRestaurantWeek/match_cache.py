@@ -0,0 +1,106 @@
+import json
+import time
+import sqlite3
+import hashlib
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+DEFAULT_MATCH_CACHE = "../data/NYCRestaurantWeek/match_decisions.sqlite"
+
+def fingerprint(value: Any) -> str:
+    """Stable digest of a JSON-like value"""
+    encoded = json.dumps(value, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(encoded.encode('utf-8')).hexdigest()
+
+class MatchDecision(NamedTuple):
+    """How one restaurant was matched against one reference list"""
+    position: Optional[int]
+    stage: str
+    score: Optional[float] = None
+    candidates: Optional[List[Tuple[int, float]]] = None
+
+class MatchDecisionCache:
+    """SQLite store of join decisions, so a rerun only matches rows that changed
+
+    Decisions are kept per reference list (source) under a context: a fingerprint of
+    the list's contents and of the matcher configuration and rules. Opening a source
+    with a different context drops its old decisions, so editing the list, changing
+    an option or a rule re-matches everything. Within a context a decision is keyed
+    by everything the matchers read from the restaurant (normalized name, exact key
+    values, nearby references), so a changed row is simply a new key.
+    """
+
+    def __init__(self, path: str = DEFAULT_MATCH_CACHE):
+        self.path = path
+        self.connection = sqlite3.connect(path)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("""
+            CREATE TABLE IF NOT EXISTS decisions (
+                source TEXT NOT NULL,
+                context TEXT NOT NULL,
+                row_key TEXT NOT NULL,
+                reference TEXT,
+                position INTEGER,
+                stage TEXT NOT NULL,
+                score REAL,
+                candidates TEXT,
+                decided_at REAL NOT NULL,
+                PRIMARY KEY (source, row_key)
+            )
+        """)
+        self.connection.commit()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def source(self, name: str, context: str) -> 'SourceDecisions':
+        """Decisions for one reference list, dropping those made under another context"""
+
+        dropped = self.connection.execute(
+            "DELETE FROM decisions WHERE source = ? AND context != ?", (name, context)
+        ).rowcount
+        self.connection.commit()
+        if dropped:
+            print(f"🗃️  Dropped {dropped} {name} match decisions made for a different list or matcher configuration")
+        return SourceDecisions(self, name, context)
+
+    def close(self):
+        self.connection.close()
+
+class SourceDecisions:
+    def __init__(self, cache: MatchDecisionCache, name: str, context: str):
+        self.connection = cache.connection
+        self.name = name
+        self.context = context
+
+    def lookup(self, row_keys: List[str]) -> Dict[str, MatchDecision]:
+        """Stored decisions for the row keys that have one"""
+
+        wanted = set(row_keys)
+        rows = self.connection.execute(
+            "SELECT row_key, position, stage, score, candidates FROM decisions WHERE source = ? AND context = ?",
+            (self.name, self.context)
+        ).fetchall()
+
+        decisions = {}
+        for row_key, position, stage, score, candidates in rows:
+            if row_key in wanted:
+                candidates = [tuple(candidate) for candidate in json.loads(candidates)] if candidates else None
+                decisions[row_key] = MatchDecision(position, stage, score, candidates)
+        return decisions
+
+    def store(self, decisions: Dict[str, Tuple[MatchDecision, str]]):
+        """Record new decisions, each with a readable identity of the matched reference"""
+
+        now = time.time()
+        self.connection.executemany(
+            "INSERT OR REPLACE INTO decisions "
+            "(source, context, row_key, reference, position, stage, score, candidates, decided_at) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            [(self.name, self.context, row_key, reference, decision.position, decision.stage, decision.score,
+              json.dumps(decision.candidates) if decision.candidates is not None else None, now)
+             for row_key, (decision, reference) in decisions.items()]
+        )
+        self.connection.commit()
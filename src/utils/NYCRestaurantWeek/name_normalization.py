@@ -0,0 +1,60 @@
+import re
+import unicodedata
+from functools import lru_cache
+from typing import Iterable, List
+
+# Single characters: punctuation that is dropped, and separators that become spaces.
+# Typographic quotes are dropped like their ASCII forms (’ in "Roberta’s").
+NAME_CHAR_TABLE = str.maketrans({
+    "'": "", '"': "", "‘": "", "’": "", "“": "", "”": "",
+    ".": "", ",": "", "!": "", "?": "",
+    "(": "", ")": "", "[": "", "]": "", "{": "", "}": "",
+    "&": "and",
+    "-": " ", "_": " ",
+})
+
+# Substrings rewritten after the punctuation is gone, in a single pass.
+#
+# Abbreviations such as "st." -> "street" or "ave." -> "avenue" can never match
+# here, since every period is already removed, so they are left out rather than
+# silently expanding "st" inside other words. "restaurants" is covered by
+# "restaurant" (it becomes "rests"), and "cafe"/"café" need no rule: accents are
+# stripped beforehand, so both spellings already normalize to "cafe".
+WORD_REPLACEMENTS = {
+    'llc': '',
+    'ltd': '',
+    'restaurant': 'rest',
+}
+
+WORD_PATTERN = re.compile('|'.join(re.escape(word) for word in WORD_REPLACEMENTS))
+WHITESPACE_PATTERN = re.compile(r'\s+')
+
+# Distinct names kept; the joins see a few thousand
+NORMALIZE_CACHE_SIZE = 65536
+
+@lru_cache(maxsize=NORMALIZE_CACHE_SIZE)
+def normalize_name(name: str) -> str:
+    """Lowercase, accent-free, punctuation-free form of a name used to compare restaurants"""
+
+    if not name:
+        return ""
+
+    normalized = name.lower().strip()
+
+    # Remove accents and diacritics
+    if not normalized.isascii():
+        normalized = unicodedata.normalize('NFD', normalized)
+        normalized = ''.join(c for c in normalized if not unicodedata.combining(c))
+
+    normalized = normalized.translate(NAME_CHAR_TABLE)
+    normalized = WORD_PATTERN.sub(lambda match: WORD_REPLACEMENTS[match.group()], normalized)
+
+    # Remove extra whitespace and normalize spaces
+    return WHITESPACE_PATTERN.sub(' ', normalized).strip()
+
+def normalize_names(names: Iterable[str]) -> List[str]:
+    """normalize_name over a whole column, normalizing each distinct value once"""
+
+    names = list(names)
+    normalized = {name: normalize_name(name) for name in dict.fromkeys(names)}
+    return [normalized[name] for name in names]
@@ -0,0 +1,121 @@
+import math
+from collections import Counter, defaultdict
+from typing import Dict, List, NamedTuple, Sequence, Tuple
+
+# Sparse matrices make the batch join a couple of matrix products; without them the
+# same scores are accumulated from an n-gram inverted index
+try:
+    import scipy.sparse
+except ImportError:
+    scipy = None
+
+NGRAM_SIZE = 3
+
+# Query rows multiplied at once; short names share common n-grams with most
+# references, so the score block is close to dense and this bounds its memory
+CHUNK_ROWS = 512
+
+class NgramSettings(NamedTuple):
+    """Batch fuzzy join: keep up to top_k references scoring at least min_score"""
+    top_k: int = 3
+    min_score: float = 0.6
+
+def name_ngrams(name: str, n: int = NGRAM_SIZE) -> List[str]:
+    """Character n-grams of a normalized name, padded so word edges count"""
+
+    padded = f" {name} "
+    return [padded[i:i + n] for i in range(len(padded) - n + 1)]
+
+class NgramMatcher:
+    """Character n-gram TF-IDF vectors of a reference list, for cosine top-k lookups
+
+    IDF comes from the reference names. N-grams a query has but no reference does get
+    the highest weight: they never match, but they still count towards the query's
+    length, so a long name is not a perfect match for a short reference it contains.
+    """
+
+    def __init__(self, names: Sequence[str]):
+        self.size = len(names)
+        grams = [Counter(name_ngrams(name)) for name in names]
+
+        self.vocabulary: Dict[str, int] = {}
+        document_frequency = Counter()
+        for counts in grams:
+            for gram in counts:
+                self.vocabulary.setdefault(gram, len(self.vocabulary))
+                document_frequency[gram] += 1
+
+        self.unseen_idf = self.idf(0)
+        self.gram_idf = [0.0] * len(self.vocabulary)
+        for gram, column in self.vocabulary.items():
+            self.gram_idf[column] = self.idf(document_frequency[gram])
+
+        vectors = [self.vectorize(counts) for counts in grams]
+        if scipy is not None:
+            self.matrix = self.sparse_matrix(vectors).T.tocsr()
+        else:
+            self.postings = defaultdict(list)
+            for row, weights in enumerate(vectors):
+                for column, weight in weights.items():
+                    self.postings[column].append((row, weight))
+
+    def idf(self, frequency: int) -> float:
+        return math.log((self.size + 1) / (frequency + 1)) + 1
+
+    def vectorize(self, counts: Counter) -> Dict[int, float]:
+        """L2-normalized weights of the n-grams in the vocabulary"""
+
+        weights = {}
+        squared = 0.0
+        for gram, count in counts.items():
+            column = self.vocabulary.get(gram)
+            weight = count * (self.gram_idf[column] if column is not None else self.unseen_idf)
+            squared += weight * weight
+            if column is not None:
+                weights[column] = weight
+
+        norm = squared ** 0.5
+        if norm:
+            weights = {column: weight / norm for column, weight in weights.items()}
+        return weights
+
+    def sparse_matrix(self, vectors: List[Dict[int, float]]):
+        rows, columns, values = [], [], []
+        for row, weights in enumerate(vectors):
+            rows.extend([row] * len(weights))
+            columns.extend(weights.keys())
+            values.extend(weights.values())
+        return scipy.sparse.csr_matrix((values, (rows, columns)), shape=(len(vectors), len(self.vocabulary)))
+
+    def top_matches(self, names: Sequence[str], settings: NgramSettings = NgramSettings()) -> List[List[Tuple[int, float]]]:
+        """For every name, up to top_k (reference index, cosine score) pairs above
+        min_score, best first; equal scores keep reference order"""
+
+        vectors = [self.vectorize(Counter(name_ngrams(name))) for name in names]
+        if scipy is None:
+            return [self.accumulate(weights, settings) for weights in vectors]
+
+        results = []
+        for start in range(0, len(vectors), CHUNK_ROWS):
+            scores = (self.sparse_matrix(vectors[start:start + CHUNK_ROWS]) @ self.matrix).tocsr()
+            scores.data[scores.data < settings.min_score] = 0
+            scores.eliminate_zeros()
+            for row in range(scores.shape[0]):
+                begin, end = scores.indptr[row], scores.indptr[row + 1]
+                results.append(self.select(scores.indices[begin:end].tolist(),
+                                           scores.data[begin:end].tolist(), settings))
+        return results
+
+    def accumulate(self, weights: Dict[int, float], settings: NgramSettings) -> List[Tuple[int, float]]:
+        scores = defaultdict(float)
+        for column, weight in weights.items():
+            for row, reference_weight in self.postings[column]:
+                scores[row] += weight * reference_weight
+        return self.select(list(scores.keys()), list(scores.values()), settings)
+
+    @staticmethod
+    def select(rows: List[int], scores: List[float], settings: NgramSettings) -> List[Tuple[int, float]]:
+        candidates = [(row, round(score, 4)) for row, score in zip(rows, scores)
+                      if score >= settings.min_score]
+        candidates.sort(key=lambda candidate: (-candidate[1], candidate[0]))
+        return candidates[:settings.top_k]
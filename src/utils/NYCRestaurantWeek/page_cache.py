@@ -0,0 +1,196 @@
+import os
+import gzip
+import time
+import sqlite3
+import hashlib
+import argparse
+import threading
+from typing import Iterator, Optional, Tuple
+
+DEFAULT_CACHE_DIR = "../data/NYCRestaurantWeek/.page_cache"
+
+class PageCache:
+    """Content-addressed on-disk cache of fetched pages
+
+    Bodies are stored gzip-compressed under objects/<aa>/<sha256>.gz, so identical
+    pages share one file; a SQLite index maps each URL to its digest, fetch time and
+    last access. Entries older than the TTL count as misses, and once the stored
+    bytes exceed max_bytes the least recently used entries are evicted. In offline
+    mode every cached page is served regardless of age and nothing else is fetched.
+    """
+
+    def __init__(self, cache_dir: str = DEFAULT_CACHE_DIR, ttl_seconds: float = 24 * 3600,
+                 max_bytes: int = 200 * 1024 * 1024, offline: bool = False):
+        self.cache_dir = cache_dir
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self.offline = offline
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+        os.makedirs(os.path.join(cache_dir, 'objects'), exist_ok=True)
+
+        # Shared by the worker threads; the lock serialises access
+        self.connection = sqlite3.connect(os.path.join(cache_dir, 'index.sqlite'), check_same_thread=False)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("""
+            CREATE TABLE IF NOT EXISTS entries (
+                url TEXT PRIMARY KEY,
+                digest TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                fetched_at REAL NOT NULL,
+                last_access REAL NOT NULL
+            )
+        """)
+        self.connection.execute("CREATE INDEX IF NOT EXISTS entries_last_access ON entries (last_access)")
+        self.connection.commit()
+
+    def object_path(self, digest: str) -> str:
+        return os.path.join(self.cache_dir, 'objects', digest[:2], f"{digest}.gz")
+
+    def get(self, url: str) -> Optional[str]:
+        """Cached body for a URL, or None when missing or expired"""
+
+        with self.lock:
+            row = self.connection.execute(
+                "SELECT digest, fetched_at FROM entries WHERE url = ?", (url,)
+            ).fetchone()
+
+            if row is None or (not self.offline and time.time() - row[1] > self.ttl_seconds):
+                self.misses += 1
+                return None
+
+            try:
+                with gzip.open(self.object_path(row[0]), 'rb') as f:
+                    body = f.read().decode('utf-8')
+            except FileNotFoundError:
+                # Blob removed behind our back; forget the entry
+                self.connection.execute("DELETE FROM entries WHERE url = ?", (url,))
+                self.connection.commit()
+                self.misses += 1
+                return None
+
+            self.connection.execute("UPDATE entries SET last_access = ? WHERE url = ?", (time.time(), url))
+            self.connection.commit()
+            self.hits += 1
+            return body
+
+    def put(self, url: str, body: str):
+        """Store a fetched body and evict least recently used entries if over budget"""
+
+        data = body.encode('utf-8')
+        digest = hashlib.sha256(data).hexdigest()
+        path = self.object_path(digest)
+
+        with self.lock:
+            if not os.path.exists(path):
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+
+                # Write then rename, so a crash never leaves a truncated blob behind
+                temp_path = f"{path}.{threading.get_ident()}.tmp"
+                with gzip.open(temp_path, 'wb') as f:
+                    f.write(data)
+                os.replace(temp_path, path)
+
+            previous = self.connection.execute("SELECT digest FROM entries WHERE url = ?", (url,)).fetchone()
+
+            now = time.time()
+            self.connection.execute(
+                "INSERT OR REPLACE INTO entries (url, digest, size, fetched_at, last_access) VALUES (?, ?, ?, ?, ?)",
+                (url, digest, os.path.getsize(path), now, now)
+            )
+
+            # A re-fetched page that changed no longer points at its old blob
+            if previous and previous[0] != digest:
+                self.remove_unreferenced(previous[0])
+
+            self.connection.commit()
+            self.evict()
+
+    def stored_bytes(self) -> int:
+        row = self.connection.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM (SELECT DISTINCT digest, size FROM entries)"
+        ).fetchone()
+        return row[0]
+
+    def evict(self):
+        """Drop least recently used entries until the cache fits in max_bytes (lock held)"""
+
+        total = self.stored_bytes()
+        if total <= self.max_bytes:
+            return
+
+        rows = self.connection.execute("SELECT url, digest, size FROM entries ORDER BY last_access").fetchall()
+        for url, digest, size in rows:
+            if total <= self.max_bytes:
+                break
+
+            self.connection.execute("DELETE FROM entries WHERE url = ?", (url,))
+            if self.remove_unreferenced(digest):
+                total -= size
+
+        self.connection.commit()
+
+    def remove_unreferenced(self, digest: str) -> bool:
+        """Delete a blob once no entry references it (lock held); True if it was deleted"""
+
+        # Blobs are shared by identical pages; only delete one nobody references anymore
+        still_used = self.connection.execute(
+            "SELECT 1 FROM entries WHERE digest = ? LIMIT 1", (digest,)
+        ).fetchone()
+        if still_used:
+            return False
+
+        try:
+            os.remove(self.object_path(digest))
+        except FileNotFoundError:
+            pass
+        return True
+
+    def summary(self) -> str:
+        with self.lock:
+            stored = self.stored_bytes()
+            count = self.connection.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+        return (f"{self.hits} hits, {self.misses} misses, {count} pages "
+                f"({stored / 1024 / 1024:.1f} MB of {self.max_bytes / 1024 / 1024:.0f} MB)")
+
+    def iter_pages(self) -> Iterator[Tuple[str, str]]:
+        """Every cached (url, body), regardless of age, for offline tooling such as benchmarks"""
+
+        with self.lock:
+            rows = self.connection.execute("SELECT url, digest FROM entries ORDER BY url").fetchall()
+
+        for url, digest in rows:
+            try:
+                with gzip.open(self.object_path(digest), 'rb') as f:
+                    yield url, f.read().decode('utf-8')
+            except FileNotFoundError:
+                continue
+
+    def close(self):
+        self.connection.close()
+
+def add_cache_arguments(parser: argparse.ArgumentParser):
+    """Command line options shared by the stages that fetch restaurant pages"""
+
+    parser.add_argument('--no-cache', action='store_true',
+                        help="Always fetch pages from the network and do not store them")
+    parser.add_argument('--offline', action='store_true',
+                        help="Serve pages only from the local cache, never from the network")
+    parser.add_argument('--cache-ttl', type=float, default=24,
+                        help="Hours a cached page stays fresh (default: 24)")
+    parser.add_argument('--cache-max-mb', type=float, default=200,
+                        help="Maximum size of the page cache before LRU eviction (default: 200)")
+
+def cache_from_args(args: argparse.Namespace) -> Optional[PageCache]:
+    """Build the page cache described by add_cache_arguments options"""
+
+    if args.no_cache and not args.offline:
+        return None
+
+    return PageCache(
+        ttl_seconds=args.cache_ttl * 3600,
+        max_bytes=int(args.cache_max_mb * 1024 * 1024),
+        offline=args.offline
+    )
@@ -0,0 +1,39 @@
+from typing import List, NamedTuple
+from bs4 import BeautifulSoup, CData, NavigableString, Script, Tag
+
+class Anchor(NamedTuple):
+    href: str
+    text: str
+
+class PageView(NamedTuple):
+    """Everything the page extractors read from a restaurant page, computed once per response
+
+    text is what soup.get_text() returns, anchors are the <a href> links with their
+    link text in document order, and scripts holds the contents of every <script>.
+    """
+    text: str
+    anchors: List[Anchor]
+    scripts: List[str]
+
+def build_page_view(page_content: str, features: str = 'html.parser') -> PageView:
+    """Parse a page and collect its text, anchors and scripts in a single walk of the tree"""
+
+    soup = BeautifulSoup(page_content, features)
+
+    text_parts = []
+    anchor_tags = []
+    scripts = []
+
+    for node in soup.descendants:
+        node_type = type(node)
+
+        # Same strings as get_text(): plain text and CDATA, not scripts, styles or comments
+        if node_type is NavigableString or node_type is CData:
+            text_parts.append(node)
+        elif node_type is Script:
+            scripts.append(str(node))
+        elif node_type is Tag and node.name == 'a' and node.get('href') is not None:
+            anchor_tags.append(node)
+
+    anchors = [Anchor(tag['href'], tag.get_text()) for tag in anchor_tags]
+    return PageView(''.join(text_parts), anchors, scripts)
@@ -0,0 +1,88 @@
+import threading
+from concurrent.futures import Executor, ThreadPoolExecutor, wait, FIRST_COMPLETED
+from typing import Callable, Iterable, Iterator, Optional, TypeVar
+
+T = TypeVar('T')
+R = TypeVar('R')
+
+class MapProgress:
+    """Thread-safe counters for a parallel map, printed every `report_every` completions"""
+
+    def __init__(self, total: int = 0, report_every: int = 25):
+        self.total = total
+        self.report_every = report_every
+        self.done = 0
+        self.failed = 0
+        self.lock = threading.Lock()
+
+    def update(self, failed: bool = False):
+        with self.lock:
+            self.done += 1
+            if failed:
+                self.failed += 1
+            done = self.done
+
+        if self.report_every and done % self.report_every == 0:
+            print(f"\n📊 Progress: {done}/{self.total}")
+
+def report_error(item, error: Exception):
+    print(f"❌ Error processing {item}: {error}")
+
+def ordered_parallel_map(func: Callable[[T], R], items: Iterable[T], max_workers: int = 10,
+                         progress: Optional[MapProgress] = None,
+                         on_error: Callable[[T, Exception], None] = report_error,
+                         executor: Optional[Executor] = None) -> Iterator[Optional[R]]:
+    """Run func over items in parallel and yield the results in input order
+
+    Results stream out as soon as every earlier item has finished: completed work is
+    parked in a reorder buffer keyed by input index, so restoring the order is O(n)
+    and never depends on names being unique. At most 4 * max_workers items are in
+    flight, which keeps memory flat for very long inputs. An item whose call raised
+    is passed to on_error and yields None.
+    """
+
+    own_executor = executor is None
+    if own_executor:
+        executor = ThreadPoolExecutor(max_workers=max_workers)
+
+    source = iter(items)
+    max_in_flight = 4 * max_workers
+    in_flight = {}
+    buffer = {}
+    next_index = 0
+    submitted = 0
+
+    try:
+        while True:
+            # Keep the pool fed without materialising the whole input
+            while len(in_flight) + len(buffer) < max_in_flight:
+                try:
+                    item = next(source)
+                except StopIteration:
+                    break
+                in_flight[executor.submit(func, item)] = (submitted, item)
+                submitted += 1
+
+            if not in_flight:
+                break
+
+            finished, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in finished:
+                index, item = in_flight.pop(future)
+                try:
+                    buffer[index] = future.result()
+                    failed = False
+                except Exception as e:
+                    on_error(item, e)
+                    buffer[index] = None
+                    failed = True
+                if progress:
+                    progress.update(failed)
+
+            # Release the contiguous prefix that is now complete
+            while next_index in buffer:
+                yield buffer.pop(next_index)
+                next_index += 1
+    finally:
+        if own_executor:
+            executor.shutdown(wait=True, cancel_futures=True)
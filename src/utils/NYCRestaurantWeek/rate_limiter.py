@@ -0,0 +1,86 @@
+import time
+import threading
+from typing import Dict
+from urllib.parse import urlparse
+
+class TokenBucket:
+    """Token bucket for one host: `rate` requests per second with bursts of up to `burst`
+
+    Callers reserve a slot under the lock (a few arithmetic operations) and sleep
+    outside it, so waiting threads never block each other. Tokens may
+    go negative; every reservation past the burst is pushed 1/rate further out.
+    """
+
+    def __init__(self, rate: float, burst: int = 1):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+        # Achieved rate: slots granted and when the first and last ones were due
+        self.granted = 0
+        self.first_grant = None
+        self.last_grant = None
+
+    def reserve(self) -> float:
+        """Take a slot and return how many seconds to wait before using it"""
+
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            self.tokens -= 1
+
+            wait = max(0.0, -self.tokens / self.rate)
+            self.granted += 1
+            if self.first_grant is None:
+                self.first_grant = now + wait
+            self.last_grant = max(self.last_grant or 0.0, now + wait)
+            return wait
+
+    def acquire(self):
+        """Block the calling thread until its slot is due"""
+
+        wait = self.reserve()
+        if wait > 0:
+            time.sleep(wait)
+
+    def achieved_rate(self) -> float:
+        """Requests per second actually granted between the first and the last slot
+
+        The initial burst is granted at once, so it is left out of the count; what
+        remains was paced by the refill and never exceeds the configured rate.
+        """
+
+        with self.lock:
+            if self.granted <= self.burst or self.last_grant == self.first_grant:
+                return 0.0
+            return (self.granted - self.burst) / (self.last_grant - self.first_grant)
+
+class HostRateLimiter:
+    """One token bucket per host, created on first use"""
+
+    def __init__(self, rate: float, burst: int = 1):
+        self.rate = rate
+        self.burst = burst
+        self.buckets: Dict[str, TokenBucket] = {}
+        self.lock = threading.Lock()
+
+    def bucket(self, url: str) -> TokenBucket:
+        host = urlparse(url).netloc
+        with self.lock:
+            if host not in self.buckets:
+                self.buckets[host] = TokenBucket(self.rate, self.burst)
+            return self.buckets[host]
+
+    def acquire(self, url: str):
+        self.bucket(url).acquire()
+
+    def summary(self) -> str:
+        with self.lock:
+            buckets = dict(self.buckets)
+        return ", ".join(
+            f"{host}: {bucket.achieved_rate():.1f}/{self.rate:.1f} req/s over {bucket.granted} requests"
+            for host, bucket in buckets.items()
+        )
@@ -0,0 +1,330 @@
+import os
+import json
+import time
+import queue
+import threading
+import importlib
+import requests
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+from checkpoint import CheckpointJournal
+from html_backends import default_backend, set_default_backend
+from page_cache import PageCache
+from parallel import MapProgress, ordered_parallel_map
+from rate_limiter import HostRateLimiter
+
+RESTAURANT_PAGE_URL = "https://www.nyctourism.com/restaurant-week/{slug}/"
+PAGE_EXTRACTIONS_FILE = "../data/NYCRestaurantWeek/2_PageExtractions.json"
+
+# Extractors that run on a fetched restaurant page: name -> (stage module, function(html) -> dict)
+PAGE_EXTRACTORS = {
+    'coordinates': ('2_Geocoder', 'extract_coordinates_from_html'),
+    'characteristics': ('3_Characteristics', 'extract_characteristics_from_html'),
+}
+
+def load_extractors(names: List[str]) -> Dict[str, Callable[[str], Dict]]:
+    """Import the stage modules (their names start with a digit) and return their page extractors"""
+
+    extractors = {}
+    for name in names:
+        module_name, function_name = PAGE_EXTRACTORS[name]
+        extractors[name] = getattr(importlib.import_module(module_name), function_name)
+    return extractors
+
+# Extractors loaded once per parser process, by (extractor names, HTML backend)
+_worker_extractors = {}
+
+def extract_page_in_worker(extractor_names: Tuple[str, ...], html_backend: str, page_content: str) -> Dict[str, Dict]:
+    """Parser process entry point: run the named extractors on one page body"""
+
+    key = (extractor_names, html_backend)
+    if key not in _worker_extractors:
+        set_default_backend(html_backend)
+        _worker_extractors[key] = load_extractors(list(extractor_names))
+
+    return {name: extractor(page_content) for name, extractor in _worker_extractors[key].items()}
+
+class RestaurantPagePipeline:
+    """Download each restaurant page once and run every registered extractor on that one response
+
+    The geocoder and characteristics stages both need https://www.nyctourism.com/restaurant-week/{slug}/;
+    fetching it here once and handing the body to each extractor halves the crawl.
+    """
+
+    def __init__(self, extractor_names: List[str], max_workers: int = 10, requests_per_second: float = 5.0,
+                 burst: int = 5, cache: Optional[PageCache] = None, parse_workers: Optional[int] = None):
+        self.extractors = load_extractors(extractor_names)
+        self.max_workers = max_workers
+
+        # Parsing runs in its own processes so it never holds the GIL the fetch threads need;
+        # 0 parses in the fetch threads instead
+        self.parse_workers = (os.cpu_count() or 1) if parse_workers is None else parse_workers
+        self.cache = cache
+
+        self.headers = {
+            'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+            'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
+            'Accept-Language': 'en-US,en;q=0.5',
+            'Accept-Encoding': 'gzip, deflate',
+            'Connection': 'keep-alive',
+        }
+
+        # One pooled session shared by the workers
+        self.session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=max_workers)
+        self.session.mount('https://', adapter)
+        self.session.headers.update(self.headers)
+
+        # Rate limiting for faster but respectful scraping: workers wait for their slot without holding a lock
+        self.rate_limiter = HostRateLimiter(requests_per_second, burst)
+
+        # Checkpointing: finished slugs are journaled, --resume skips them
+        self.journal: Optional[CheckpointJournal] = None
+        self.resumed_results = {}
+
+    def use_journal(self, journal: CheckpointJournal, resume: bool):
+        """Journal every finished slug; when resuming, reuse the ones already done"""
+
+        self.journal = journal
+        if resume:
+            self.resumed_results = journal.completed()
+
+    def fetch_page(self, slug: str) -> Tuple[Optional[str], Optional[str]]:
+        """Fetch a restaurant page, returning (html, error)"""
+
+        restaurant_url = RESTAURANT_PAGE_URL.format(slug=slug)
+
+        # Cached pages skip the network (and the rate limit) entirely
+        if self.cache:
+            cached = self.cache.get(restaurant_url)
+            if cached is not None:
+                return cached, None
+            if self.cache.offline:
+                return None, "not in page cache (offline)"
+
+        try:
+            # Rate limiting
+            self.rate_limiter.acquire(restaurant_url)
+
+            print(f"  🌐 Fetching: {restaurant_url}")
+
+            response = self.session.get(restaurant_url, timeout=10)
+
+            if response.status_code == 200:
+                if self.cache:
+                    self.cache.put(restaurant_url, response.text)
+                return response.text, None
+            return None, f"HTTP {response.status_code}"
+
+        except Exception as e:
+            return None, str(e)
+
+    def extract_page(self, page_content: str) -> Dict[str, Dict]:
+        """Run every extractor on one page body"""
+        return {name: extractor(page_content) for name, extractor in self.extractors.items()}
+
+    def fetch_restaurant(self, restaurant_data: Tuple[int, int, Dict]) -> Tuple[Optional[str], Optional[str]]:
+        """Fetch one restaurant's page, returning (html, error) and journaling a failed fetch"""
+
+        index, total, restaurant = restaurant_data
+        slug = restaurant.get('slug', '')
+
+        print(f"[{index}/{total}] {restaurant.get('name', 'Unknown')}")
+
+        if not slug:
+            print(f"  ❌ No slug found")
+            return None, "No slug found"
+
+        page_content, error = self.fetch_page(slug)
+
+        if page_content is None:
+            print(f"  ❌ {error}")
+            if self.journal:
+                self.journal.record_failure(slug, error)
+
+        return page_content, error
+
+    def record_extractions(self, restaurant: Dict, extractions: Dict[str, Dict]):
+        if self.journal:
+            self.journal.record(restaurant['slug'], extractions)
+
+    def process_restaurant(self, restaurant_data: Tuple[int, int, Dict]) -> Optional[Dict[str, Dict]]:
+        """Fetch one restaurant page and extract everything from it in the calling thread"""
+
+        page_content, _ = self.fetch_restaurant(restaurant_data)
+        if page_content is None:
+            return None
+
+        extractions = self.extract_page(page_content)
+        self.record_extractions(restaurant_data[2], extractions)
+        return extractions
+
+    def fetch_and_parse(self, restaurant_data: List[Tuple[int, int, Dict]],
+                        progress: MapProgress) -> Iterator[Optional[Dict[str, Dict]]]:
+        """Fetch pages on threads and parse them on a process pool, yielding extractions in input order
+
+        Fetch threads put raw bodies on a bounded queue; the parser pool takes at most
+        2 * parse_workers pages at a time. When the parsers fall behind the queue fills
+        up and the fetchers block, so memory stays bounded while the network and every
+        core stay busy.
+        """
+
+        bodies = queue.Queue(maxsize=2 * self.max_workers)
+        work = iter(enumerate(restaurant_data))
+        work_lock = threading.Lock()
+        stop = threading.Event()
+
+        def put(item):
+            while not stop.is_set():
+                try:
+                    bodies.put(item, timeout=0.1)
+                    return
+                except queue.Full:
+                    continue
+
+        def fetcher():
+            while not stop.is_set():
+                with work_lock:
+                    item = next(work, None)
+                if item is None:
+                    break
+
+                index, data = item
+                try:
+                    page_content, error = self.fetch_restaurant(data)
+                except Exception as e:
+                    page_content, error = None, str(e)
+                put((index, page_content, error))
+
+            # One sentinel per fetcher tells the consumer it is done
+            put(None)
+
+        fetchers = [threading.Thread(target=fetcher, daemon=True) for _ in range(self.max_workers)]
+        for thread in fetchers:
+            thread.start()
+
+        extractor_names = tuple(self.extractors)
+        html_backend = default_backend()
+        max_in_flight = 2 * self.parse_workers
+        in_flight = {}
+        buffer = {}
+        next_index = 0
+        running_fetchers = len(fetchers)
+
+        try:
+            with ProcessPoolExecutor(max_workers=self.parse_workers) as pool:
+                while running_fetchers or in_flight:
+                    # Hand the next fetched body to the parsers while they have room
+                    if running_fetchers and len(in_flight) < max_in_flight:
+                        try:
+                            item = bodies.get(timeout=0.05 if in_flight else None)
+                        except queue.Empty:
+                            item = False
+
+                        if item is None:
+                            running_fetchers -= 1
+                        elif item is not False:
+                            index, page_content, error = item
+                            if page_content is None:
+                                buffer[index] = None
+                                progress.update(failed=True)
+                            else:
+                                future = pool.submit(extract_page_in_worker, extractor_names, html_backend, page_content)
+                                in_flight[future] = index
+                    elif in_flight:
+                        wait(in_flight, return_when=FIRST_COMPLETED)
+
+                    # Collect finished parses
+                    for future in [future for future in in_flight if future.done()]:
+                        index = in_flight.pop(future)
+                        restaurant = restaurant_data[index][2]
+                        try:
+                            extractions = future.result()
+                            self.record_extractions(restaurant, extractions)
+                            buffer[index] = extractions
+                            progress.update()
+                        except Exception as e:
+                            print(f"❌ Error processing {restaurant.get('slug')}: {e}")
+                            if self.journal:
+                                self.journal.record_failure(restaurant['slug'], str(e))
+                            buffer[index] = None
+                            progress.update(failed=True)
+
+                    # Release the contiguous prefix that is now complete
+                    while next_index in buffer:
+                        yield buffer.pop(next_index)
+                        next_index += 1
+        finally:
+            stop.set()
+
+    def run(self, restaurants: List[Dict]) -> Dict[str, Dict[str, Dict]]:
+        """Fetch every restaurant page once; returns {slug: {extractor name: result}} for fetched pages"""
+
+        print(f"🌐 Fetching {len(restaurants)} restaurant pages once for: {', '.join(self.extractors)}")
+
+        results = {}
+
+        # Slugs finished by an interrupted run are taken from the journal
+        for restaurant in restaurants:
+            slug = restaurant.get('slug')
+            if slug in self.resumed_results and set(self.extractors) <= set(self.resumed_results[slug]):
+                results[slug] = self.resumed_results[slug]
+        if results:
+            print(f"♻️  Reusing {len(results)} journaled pages, fetching the rest")
+
+        pending = [restaurant for restaurant in restaurants if restaurant.get('slug') not in results]
+        restaurant_data = [(i+1, len(pending), restaurant) for i, restaurant in enumerate(pending)]
+
+        # Results come back in input order
+        progress = MapProgress(total=len(pending))
+        if self.parse_workers and restaurant_data:
+            print(f"⚙️  Fetching on {self.max_workers} threads, parsing on {self.parse_workers} processes")
+            extracted = self.fetch_and_parse(restaurant_data, progress)
+        else:
+            extracted = ordered_parallel_map(self.process_restaurant, restaurant_data,
+                                             max_workers=self.max_workers, progress=progress,
+                                             on_error=lambda data, e: print(f"❌ Error processing {data[2].get('slug')}: {e}"))
+        for (_, _, restaurant), extractions in zip(restaurant_data, extracted):
+            if extractions is not None:
+                results[restaurant['slug']] = extractions
+
+        # Key the pages in listing order, journaled ones included
+        results = {restaurant['slug']: results[restaurant['slug']]
+                   for restaurant in restaurants if restaurant.get('slug') in results}
+
+        print(f"✅ Extracted {len(results)}/{len(restaurants)} restaurant pages")
+        if self.cache:
+            print(f"🗄️  Page cache: {self.cache.summary()}")
+        if self.rate_limiter.buckets:
+            print(f"⏱️  Request rate: {self.rate_limiter.summary()}")
+        return results
+
+def save_page_extractions(page_results: Dict[str, Dict[str, Dict]], filename: str = PAGE_EXTRACTIONS_FILE):
+    """Save per-slug extractions so later stages can consume them without refetching"""
+
+    try:
+        with open(filename, 'w', encoding='utf-8') as f:
+            json.dump({
+                'fetched_at': time.strftime('%Y-%m-%d %H:%M:%S'),
+                'pages': page_results
+            }, f, indent=2, ensure_ascii=False)
+        print(f"💾 Page extractions saved to {filename}")
+
+    except Exception as e:
+        print(f"Error saving page extractions: {e}")
+
+def load_page_extractions(filename: str = PAGE_EXTRACTIONS_FILE) -> Dict[str, Dict[str, Dict]]:
+    """Load the per-slug extractions written by the geocoder stage"""
+
+    try:
+        with open(filename, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        print(f"📂 Loaded page extractions for {len(data['pages'])} restaurants (fetched {data.get('fetched_at')})")
+        return data['pages']
+    except FileNotFoundError:
+        print(f"📂 No page extractions found at {filename}")
+        return {}
+    except Exception as e:
+        print(f"⚠️  Could not load page extractions: {e}")
+        return {}
@@ -0,0 +1,25 @@
+import importlib
+import json
+
+import pytest
+
+pytest.importorskip('requests')
+geocoder = importlib.import_module('2_Geocoder')
+
+def page(venue) -> str:
+    return f"<script>window.__DATA__ = {json.dumps({'venue': venue})};</script>"
+
+@pytest.mark.parametrize('location', ["40.7,-73.9", [40.7, -73.9], None])
+def test_malformed_location_falls_back_to_the_venue_coordinates(location):
+    venue = geocoder.parse_venue_json(page({
+        'venueAddress': '1 Main St', 'location': location, 'latitude': 40.7, 'longitude': -73.9,
+    }))
+
+    assert (venue.latitude, venue.longitude) == (40.7, -73.9)
+
+def test_location_object_wins():
+    venue = geocoder.parse_venue_json(page({
+        'venueAddress': '1 Main St', 'location': {'lat': 40.75, 'lon': -73.98}, 'latitude': 1, 'longitude': 2,
+    }))
+
+    assert (venue.latitude, venue.longitude) == (40.75, -73.98)
@@ -0,0 +1,40 @@
+import importlib
+
+import pytest
+
+pytest.importorskip('pandas')
+join_data = importlib.import_module('4_join_data')
+
+def cascade(restaurants, references, keys):
+    matches, _ = join_data.match_cascade(restaurants, 'name', join_data.MatchIndex(references),
+                                         join_data.ExactKeyIndex(references, keys))
+    return matches
+
+def test_website_domain_matches_a_renamed_restaurant():
+    references = [
+        {'name': 'Le Coucou', 'website': 'https://lecoucou.com/'},
+        {'name': 'Frenchette', 'website': 'https://www.frenchettenyc.com'},
+    ]
+    restaurants = [{'name': 'Coucou Tribeca', 'website': 'http://www.lecoucou.com/menus'}]
+
+    assert cascade(restaurants, references, []) == [(None, '')]
+    assert cascade(restaurants, references, ['website', 'telephone']) == [(0, 'exact_website')]
+
+def test_telephone_picks_the_branch_the_name_cannot():
+    references = [
+        {'name': 'Dos Caminos', 'telephone': '212-555-0199'},
+        {'name': 'Dos Caminos Times Square', 'telephone': '+1 (212) 555-0101'},
+    ]
+    restaurants = [{'name': 'Dos Caminos', 'telephone': '2125550101'}]
+
+    assert cascade(restaurants, references, []) == [(0, 'fuzzy_name')]
+    assert cascade(restaurants, references, ['website', 'telephone']) == [(1, 'exact_telephone')]
+
+def test_website_shared_by_a_group_decides_nothing():
+    references = [
+        {'name': 'Dos Caminos Soho', 'website': 'https://doscaminos.com'},
+        {'name': 'Dos Caminos Midtown', 'website': 'https://doscaminos.com'},
+    ]
+    restaurants = [{'name': 'Atla', 'website': 'doscaminos.com'}]
+
+    assert cascade(restaurants, references, ['website']) == [(None, '')]
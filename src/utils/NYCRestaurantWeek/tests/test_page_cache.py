@@ -0,0 +1,28 @@
+import os
+
+from page_cache import PageCache
+
+def blob_count(cache_dir) -> int:
+    return sum(len(files) for _, _, files in os.walk(os.path.join(cache_dir, 'objects')))
+
+def test_overwriting_a_url_removes_its_old_blob(tmp_path):
+    cache = PageCache(str(tmp_path), ttl_seconds=0)
+
+    for version in range(50):
+        cache.put('https://example.com/page', f"<html>version {version}</html>")
+
+    assert blob_count(tmp_path) == 1
+    assert cache.stored_bytes() == os.path.getsize(
+        cache.object_path(cache.connection.execute("SELECT digest FROM entries").fetchone()[0]))
+    cache.close()
+
+def test_overwriting_keeps_a_blob_other_urls_still_share(tmp_path):
+    cache = PageCache(str(tmp_path))
+
+    cache.put('https://example.com/a', "<html>same</html>")
+    cache.put('https://example.com/b', "<html>same</html>")
+    cache.put('https://example.com/a', "<html>changed</html>")
+
+    assert blob_count(tmp_path) == 2
+    assert cache.get('https://example.com/b') == "<html>same</html>"
+    cache.close()
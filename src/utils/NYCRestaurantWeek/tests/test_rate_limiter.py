@@ -0,0 +1,20 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from rate_limiter import TokenBucket
+
+def test_achieved_rate_leaves_out_the_initial_burst():
+    bucket = TokenBucket(rate=100.0, burst=5)
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        list(executor.map(lambda _: bucket.acquire(), range(30)))
+
+    assert bucket.granted == 30
+    assert 95.0 <= bucket.achieved_rate() <= 100.0
+
+def test_achieved_rate_is_zero_within_the_burst():
+    bucket = TokenBucket(rate=100.0, burst=5)
+
+    for _ in range(5):
+        bucket.acquire()
+
+    assert bucket.achieved_rate() == 0.0